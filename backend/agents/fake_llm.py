@@ -0,0 +1,173 @@
+import asyncio
+import csv
+import hashlib
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import yaml
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Add project root to Python path
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(project_root))
+# Script and ground-truth paths are relative to the backend directory
+backend_root = Path(__file__).resolve().parent.parent
+
+from services.answer_cache import normalize_question
+
+DEFAULT_ANSWER = "Answer:\n{tool_output}\n\nUsed SQL:\n```sql\n{sql}\n```"
+# Without a script or ground truth entry: look at the schema, then answer
+DEFAULT_STEPS = [
+    {"tool_calls": [{"name": "get_schema", "args": {"table_name": "all"}}]},
+    {"content": DEFAULT_ANSWER},
+]
+_TOKEN = re.compile(r"\S+\s*|\s+")
+
+
+def _fill(template: str, values: Dict[str, str]) -> str:
+    # Plain replacement: answers may contain JSON braces that str.format would choke on
+    for name, value in values.items():
+        template = template.replace("{" + name + "}", value)
+    return template
+
+
+class ScriptedChatModel(BaseChatModel):
+    '''Deterministic, offline stand-in for the chat model (llm.model: fake).
+
+    Each user turn follows a list of steps; the step to play is the number of
+    AI messages already in the current turn, so the model itself is stateless
+    and threads can run concurrently. A step either calls tools
+    ({"tool_calls": [{"name", "args"}]}) or answers ({"content": template},
+    where {question}, {sql} and {tool_output} are filled from the turn).
+    Steps come from the first script whose "match" regex finds the question,
+    else from a ground-truth CSV (get_schema, the ground-truth SQL through
+    execute_sql_query, then an answer), else DEFAULT_STEPS. latency_ms delays
+    the first output of every call and token_latency_ms each streamed chunk.
+    '''
+
+    scripts: List[Dict[str, Any]] = []
+    ground_truth: Dict[str, str] = {}
+    latency_ms: float = 0.0
+    token_latency_ms: float = 0.0
+
+    @classmethod
+    def from_config(cls, fake_config: Dict[str, Any], script_path: Optional[str] = None) -> "ScriptedChatModel":
+        script_path = script_path or fake_config.get('script')
+        scripts = []
+        if script_path:
+            with open(backend_root / script_path) as f:
+                scripts = yaml.safe_load(f) or []
+        ground_truth = {}
+        ground_truth_path = fake_config.get('ground_truth')
+        if ground_truth_path and (backend_root / ground_truth_path).exists():
+            with open(backend_root / ground_truth_path, newline='', encoding='utf-8-sig') as f:
+                for record in csv.DictReader(f, delimiter=fake_config.get('ground_truth_separator', '|')):
+                    ground_truth[normalize_question(record['User Input'])] = record['Ground Truth SQL']
+        return cls(
+            scripts=scripts,
+            ground_truth=ground_truth,
+            latency_ms=fake_config.get('latency_ms', 0.0),
+            token_latency_ms=fake_config.get('token_latency_ms', 0.0),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _steps(self, question: str) -> List[Dict[str, Any]]:
+        for script in self.scripts:
+            if re.search(script.get("match", ""), question, re.IGNORECASE):
+                return script["steps"]
+        sql = self.ground_truth.get(normalize_question(question))
+        if sql:
+            return [
+                {"tool_calls": [{"name": "get_schema", "args": {"table_name": "all"}}]},
+                {"tool_calls": [{"name": "execute_sql_query", "args": {"query": sql}}]},
+                {"content": DEFAULT_ANSWER},
+            ]
+        return DEFAULT_STEPS
+
+    def _respond(self, messages: List[BaseMessage], tools_bound: bool) -> AIMessage:
+        start = max((i for i, message in enumerate(messages) if isinstance(message, HumanMessage)), default=0)
+        question = messages[start].content if messages and isinstance(messages[start].content, str) else ""
+        turn = messages[start + 1:]
+        step_index = sum(isinstance(message, AIMessage) for message in turn)
+        steps = self._steps(question)
+        step = steps[step_index] if step_index < len(steps) else {"content": DEFAULT_ANSWER}
+        if not tools_bound and "tool_calls" in step:
+            # Summaries and other tool-less calls always get text back
+            step = {"content": DEFAULT_ANSWER}
+
+        usage_in = count_tokens_approximately(messages)
+        if "tool_calls" in step:
+            prefix = hashlib.sha256(question.encode()).hexdigest()[:8]
+            tool_calls = [
+                {"name": call["name"], "args": dict(call.get("args", {})), "id": f"call_{prefix}_{step_index}_{n}"}
+                for n, call in enumerate(step["tool_calls"])
+            ]
+            message = AIMessage(content="", tool_calls=tool_calls)
+        else:
+            sql = next(
+                (call["args"].get("query", "") for message in reversed(turn) if isinstance(message, AIMessage)
+                 for call in message.tool_calls if call["name"] == "execute_sql_query"),
+                "",
+            )
+            tool_output = next((str(message.content) for message in reversed(turn) if isinstance(message, ToolMessage)), "")
+            message = AIMessage(content=_fill(step["content"], {"question": question, "sql": sql, "tool_output": tool_output}))
+        usage_out = count_tokens_approximately([message])
+        message.usage_metadata = {"input_tokens": usage_in, "output_tokens": usage_out, "total_tokens": usage_in + usage_out}
+        return message
+
+    def _chunks(self, message: AIMessage) -> List[AIMessageChunk]:
+        if message.tool_calls:
+            chunks = [AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": n}
+                for n, call in enumerate(message.tool_calls)
+            ])]
+        else:
+            chunks = [AIMessageChunk(content=token) for token in _TOKEN.findall(message.content)] or [AIMessageChunk(content="")]
+        chunks[-1].usage_metadata = message.usage_metadata
+        return chunks
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, bool(kwargs.get("tools"))))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, bool(kwargs.get("tools"))))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_ms / 1000)
+        for n, chunk in enumerate(self._chunks(self._respond(messages, bool(kwargs.get("tools"))))):
+            if n:
+                time.sleep(self.token_latency_ms / 1000)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                run_manager.on_llm_new_token(generation.text, chunk=generation)
+            yield generation
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_ms / 1000)
+        for n, chunk in enumerate(self._chunks(self._respond(messages, bool(kwargs.get("tools"))))):
+            if n:
+                await asyncio.sleep(self.token_latency_ms / 1000)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(generation.text, chunk=generation)
+            yield generation
+
+
+def is_fake_model(model: Optional[str]) -> bool:
+    return bool(model) and (model == "fake" or model.startswith("fake:"))
@@ -0,0 +1,152 @@
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+# Add project root to Python path
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+from logger import logger
+
+# Tags the summarizer's LLM calls so streaming clients never see them
+SUMMARY_TAG = "history_summary"
+
+
+class HistoryCompactor:
+    '''Shrinks the message history sent to the LLM on every assistant step.
+
+    The checkpointed state keeps the full conversation; only the prompt is
+    compacted, in three stages:
+    1. Tool outputs from turns older than keep_recent_turns are cut to
+       stale_tool_output_chars (with 0, all but the latest tool step). Older
+       get_schema outputs are elided, except the latest one, as are outputs
+       superseded by a later get_schema('all').
+    2. While the prompt is over max_input_tokens, the oldest whole turns are
+       dropped (a turn starts at a user message, so tool calls stay paired
+       with their results). The current turn is never dropped.
+    3. With summarize enabled, dropped turns are replaced by a short LLM
+       summary, cached per dropped prefix so each one is summarized once.
+    '''
+
+    def __init__(self, llm, history_config: Optional[Dict[str, Any]] = None):
+        history_config = history_config if history_config is not None else config.assistant_config.get('history', {})
+        self.llm = llm
+        self.enabled = history_config.get('enabled', True)
+        self.max_input_tokens = history_config.get('max_input_tokens', 8000)
+        self.keep_recent_turns = history_config.get('keep_recent_turns', 2)
+        self.stale_tool_output_chars = history_config.get('stale_tool_output_chars', 300)
+        self.schema_tools = set(history_config.get('schema_tools', ['get_schema']))
+        self.summarize = history_config.get('summarize', False)
+        self.summary_max_tokens = history_config.get('summary_max_tokens', 300)
+        self.token_counter = history_config.get('token_counter', 'approximate')
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+
+    def count_tokens(self, messages: Sequence[BaseMessage]) -> int:
+        if self.token_counter == 'model':
+            try:
+                return self.llm.get_num_tokens_from_messages(list(messages))
+            except Exception:
+                pass
+        return count_tokens_approximately(messages)
+
+    @staticmethod
+    def _turn_starts(messages: Sequence[BaseMessage]) -> List[int]:
+        return [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+
+    def _recent_start(self, messages: Sequence[BaseMessage]) -> int:
+        """Index of the first message whose tool outputs are sent in full"""
+        if self.keep_recent_turns <= 0:
+            # Still, the model reads the outputs of its latest tool calls once
+            return next((i + 1 for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], AIMessage)), 0)
+        turn_starts = self._turn_starts(messages)
+        return turn_starts[-self.keep_recent_turns] if len(turn_starts) >= self.keep_recent_turns else 0
+
+    def _elide_stale_tool_outputs(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        recent_start = self._recent_start(messages)
+        full_schema_calls = {
+            call["id"]
+            for message in messages if isinstance(message, AIMessage)
+            for call in message.tool_calls
+            if call["name"] in self.schema_tools and call["args"].get("table_name", "all") == "all"
+        }
+        schema_outputs = [
+            i for i, message in enumerate(messages)
+            if isinstance(message, ToolMessage) and message.name in self.schema_tools
+        ]
+        latest_schema = schema_outputs[-1] if schema_outputs else None
+        # Everything before the latest full schema is repeated by it
+        latest_full_schema = max(
+            (i for i in schema_outputs if messages[i].tool_call_id in full_schema_calls), default=-1
+        )
+        compacted = []
+        for i, message in enumerate(messages):
+            if isinstance(message, ToolMessage) and i != latest_schema:
+                content = message.content if isinstance(message.content, str) else str(message.content)
+                if message.name in self.schema_tools:
+                    if i < recent_start or i < latest_full_schema:
+                        message = message.model_copy(update={"content": "[older schema output elided; see the latest get_schema result]"})
+                elif i < recent_start and len(content) > self.stale_tool_output_chars:
+                    message = message.model_copy(update={
+                        "content": f"{content[:self.stale_tool_output_chars]}... [{len(content) - self.stale_tool_output_chars} characters elided]"
+                    })
+            compacted.append(message)
+        return compacted
+
+    async def _summary(self, dropped: List[BaseMessage]) -> str:
+        key = dropped[-1].id or str(len(dropped))
+        if key in self._summaries:
+            self._summaries.move_to_end(key)
+            return self._summaries[key]
+        transcript = "\n".join(
+            f"{message.type}: {message.content if isinstance(message.content, str) else message.content!r}"
+            for message in dropped
+        )
+        response = await self.llm.with_config(tags=[SUMMARY_TAG]).ainvoke([
+            SystemMessage(content=(
+                "Summarize this earlier part of a conversation with a SQL assistant in at most "
+                f"{self.summary_max_tokens} tokens. Keep the user's goals, the tables and columns used "
+                "and the final SQL of each answer."
+            )),
+            HumanMessage(content=transcript),
+        ])
+        self._summaries[key] = response.content
+        if len(self._summaries) > 256:
+            self._summaries.popitem(last=False)
+        return response.content
+
+    async def compact(self, system_message: BaseMessage, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        """Return the prompt for the next LLM call: system message plus compacted history"""
+        prompt = [system_message] + list(messages)
+        if not self.enabled:
+            return prompt
+        tokens_before = self.count_tokens(prompt)
+
+        history = self._elide_stale_tool_outputs(list(messages))
+        dropped: List[BaseMessage] = []
+        turn_starts = self._turn_starts(history)
+        # Drop whole turns from the front, keeping at least the current one
+        while len(turn_starts) > 1 and self.count_tokens([system_message] + history) > self.max_input_tokens:
+            cut = turn_starts[1]
+            dropped.extend(history[:cut])
+            history = history[cut:]
+            turn_starts = self._turn_starts(history)
+
+        if dropped and self.summarize:
+            summary = await self._summary(dropped)
+            # Folded into the system message: not every provider accepts a second one
+            system_message = SystemMessage(
+                content=f"{system_message.content}\n\nSummary of the earlier conversation:\n{summary}"
+            )
+        compacted = [system_message] + history
+
+        tokens_after = self.count_tokens(compacted)
+        logger.info(
+            "History compaction: %d -> %d tokens, %d -> %d messages (%d dropped)",
+            tokens_before, tokens_after, len(prompt), len(compacted), len(dropped),
+        )
+        return compacted
@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from langchain.chat_models import init_chat_model
+
+# Add project root to Python path
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+from agents.fake_llm import ScriptedChatModel, is_fake_model
+
+
+def create_chat_model(llm_config: Optional[Dict[str, Any]] = None):
+    """Chat model selected by llm.model: "fake" or "fake:<script.yaml>" for the offline stand-in"""
+    llm_config = llm_config if llm_config is not None else config.llm_config
+    model = llm_config['model']
+    if is_fake_model(model):
+        script_path = model.split(":", 1)[1] if ":" in model else None
+        return ScriptedChatModel.from_config(llm_config.get('fake', {}), script_path)
+    return init_chat_model(
+        model,
+        temperature=llm_config['temperature'],
+        max_tokens=llm_config['max_tokens'],
+        streaming=llm_config['streaming']
+    )
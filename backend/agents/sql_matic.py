@@ -1,6 +1,10 @@
+import asyncio
 import sys
+import hashlib
+import json
 from pathlib import Path
 import os
+from contextlib import aclosing, asynccontextmanager
 
 # Add project root to Python path
 project_root = Path(__file__).resolve().parent.parent.parent
@@ -9,14 +13,24 @@ sys.path.append(str(project_root))
 from langgraph.prebuilt import tools_condition, ToolNode
 
 from config import config
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.chat_models import init_chat_model
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import START, MessagesState, StateGraph
-from tools.get_schema import get_schema
+from tools.async_tools import ASYNC_TOOLS, run_in_tool_executor
 from tools.execute_sql import execute_sql_query
-from tools.query_data_dictionary import get_db_field_definition
-from langgraph.checkpoint.memory import MemorySaver
-from typing import Literal
+from tools.schema_getters import schema_cache
+from tools.schema_retrieval import relevant_schema_prompt
+from agents.history import HistoryCompactor, SUMMARY_TAG
+from agents.llm_factory import create_chat_model
+from tools.query_budget import CancelScope, query_cancel_scope, query_purpose
+from services.checkpointer import get_checkpointer
+from services.session_manager import session_manager
+from services.answer_cache import answer_cache, render_refreshed_answer
+from services.llm_replay import wrap_with_replay
+from services.metrics import graph_node_duration, llm_tokens, runs_cancelled
+from services.tracing import tracer
+from logger import logger
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
 
 class SQLQueryAssistant:
     '''We need to redefine graph again.
@@ -29,19 +43,25 @@ class SQLQueryAssistant:
     
     def __init__(self,purpose : Literal['regular','evaluator']):
         self.db_path = config.database_config['default_path']
-        self.memory = MemorySaver()
+        # Shared, config-selected checkpointer so threads survive reconnects to other
+        # workers; the Postgres one arrives through attach_checkpointer on startup
+        self.memory = get_checkpointer()
         self.purpose = purpose
     
         
-        self.llm = init_chat_model(
-            config.llm_config['model'],
-            temperature=config.llm_config['temperature'],
-            max_tokens=config.llm_config['max_tokens'],
-            streaming=config.llm_config['streaming']
-        )
+        # llm.model: fake swaps in the scripted offline model for CI and benchmarks
+        self.llm = create_chat_model()
         
-        self.tools = [get_schema, execute_sql_query, get_db_field_definition]
-        self.llm_with_tools = self.llm.bind_tools(self.tools)
+        # Async tools run on a bounded thread pool; ToolNode gathers the
+        # tool calls of one LLM turn concurrently
+        self.tools = ASYNC_TOOLS
+        # With llm.replay on, recorded responses stand in for live calls
+        self.llm_with_tools = wrap_with_replay(self.llm.bind_tools(self.tools), self.tools, purpose)
+        self.history_compactor = HistoryCompactor(self.llm)
+        # Repeated questions skip the LLM; evaluation always asks it
+        self.answer_cache_config = config.assistant_config.get('answer_cache', {})
+        use_answer_cache = purpose == 'regular' and self.answer_cache_config.get('enabled', True)
+        self.answer_cache = answer_cache if use_answer_cache else None
         self.setup_graph()
         
 
@@ -51,17 +71,62 @@ class SQLQueryAssistant:
             system_message = config.assistant_config['regular_system_message']
         else:
             system_message = config.assistant_config['evaluator_system_message']
+        self.system_message = system_message
+        self.system_prompt_hash = hashlib.sha256(system_message.encode()).hexdigest()[:16]
         sys_msg = SystemMessage(content=system_message)        
+        retrieval_config = config.assistant_config.get('schema_retrieval', {})
         
+        assistant_duration = graph_node_duration.labels(node="assistant")
+        tools_duration = graph_node_duration.labels(node="tools")
+        input_tokens = llm_tokens.labels(direction="input")
+        output_tokens = llm_tokens.labels(direction="output")
+
         async def assistant(state: MessagesState):
-            return {"messages": [await self.llm_with_tools.ainvoke([sys_msg] + state["messages"])]}
+            with tracer.span("graph.assistant"), assistant_duration.time():
+                system = sys_msg
+                if retrieval_config.get('enabled', True):
+                    # Definitions of the tables relevant to the current question, so
+                    # the model rarely needs a get_schema round-trip
+                    question = next(
+                        (message.content for message in reversed(state["messages"]) if isinstance(message, HumanMessage)),
+                        None,
+                    )
+                    schema_section = None
+                    try:
+                        if question:
+                            schema_section = await run_in_tool_executor(relevant_schema_prompt, question, retrieval_config)
+                    except Exception as e:
+                        # Only a shortcut: without it the model calls get_schema itself
+                        logger.error("Schema retrieval failed, using the plain system message: %s", e)
+                    if schema_section:
+                        system = SystemMessage(content=f"{system_message}\n\n{schema_section}")
+                # Stale tool outputs and old turns are compacted in the prompt only;
+                # the checkpointed state keeps the full history
+                prompt = await self.history_compactor.compact(system, state["messages"])
+                with tracer.span("llm.call", model=config.llm_config.get('model'), prompt_messages=len(prompt)) as llm_span:
+                    response = await self.llm_with_tools.ainvoke(prompt)
+                    llm_span.set(
+                        tool_calls=[call["name"] for call in response.tool_calls],
+                        **(response.usage_metadata or {}),
+                    )
+            if response.usage_metadata:
+                input_tokens.inc(response.usage_metadata.get("input_tokens", 0))
+                output_tokens.inc(response.usage_metadata.get("output_tokens", 0))
+            return {"messages": [response]}
+
+        tool_node = ToolNode(self.tools)
+
+        async def tools(state: MessagesState, config: RunnableConfig):
+            # Wrapped only to time the node; ToolNode still gets the run's config
+            with tracer.span("graph.tools"), tools_duration.time():
+                return await tool_node.ainvoke(state, config)
 
         # Graph
         builder = StateGraph(MessagesState)
         
         # Define nodes
         builder.add_node("assistant", assistant)
-        builder.add_node("tools", ToolNode(self.tools))
+        builder.add_node("tools", tools)
         
         # Define edges
         builder.add_edge(START, "assistant")
@@ -73,6 +138,11 @@ class SQLQueryAssistant:
         
         self.graph = builder.compile(checkpointer=self.memory)
 
+    def attach_checkpointer(self, checkpointer):
+        """Recompile the graph with a checkpointer created after this assistant"""
+        self.memory = checkpointer
+        self.graph = self.graph.builder.compile(checkpointer=checkpointer)
+
     async def process_query(self, query: str, thread_id=None) -> str:
         if not thread_id:
             thread_id = config.assistant_config['process']['default_thread_id']
@@ -82,6 +152,191 @@ class SQLQueryAssistant:
                 "thread_id": thread_id
             }
         }
-        result = await self.graph.ainvoke({"messages": messages}, config_params)
+        with tracer.span("assistant.process_query", session_id=thread_id, purpose=self.purpose, question=query) as span:
+            async with self._run(thread_id, config_params):
+                if self.answer_cache is not None:
+                    answer = await self._cached_answer(query, config_params)
+                    if answer is not None:
+                        span.set(cached=True)
+                        return answer
+                result = await self.graph.ainvoke({"messages": messages}, config_params)
+                await self._remember_answer(query, result['messages'])
         return result['messages'][-1].content
 
+    @asynccontextmanager
+    async def _run(self, thread_id, config_params: dict):
+        '''Context of one graph run: session tracking plus the purpose and
+        cancellation scope its tools see. A cancelled run interrupts the SQL
+        it still has running and leaves the thread ready for the next question.
+        '''
+        previous_purpose, previous_scope = query_purpose.get(), query_cancel_scope.get()
+        # Tools pick their query budget from the purpose of the calling assistant
+        purpose_token = query_purpose.set(self.purpose)
+        cancel_scope = CancelScope()
+        scope_token = query_cancel_scope.set(cancel_scope)
+        try:
+            async with session_manager.track(thread_id):
+                try:
+                    yield
+                except (asyncio.CancelledError, GeneratorExit):
+                    cancel_scope.cancel("run cancelled")
+                    runs_cancelled.inc()
+                    await asyncio.shield(self._close_cancelled_run(config_params))
+                    raise
+        finally:
+            try:
+                query_cancel_scope.reset(scope_token)
+                query_purpose.reset(purpose_token)
+            except ValueError:
+                # Async generators may be finalized from another context
+                query_cancel_scope.set(previous_scope)
+                query_purpose.set(previous_purpose)
+
+    async def _close_cancelled_run(self, config_params: dict):
+        """Answer the tool calls a cancelled run left open; the LLM rejects a history with unanswered calls"""
+        try:
+            state = await self.graph.aget_state(config_params)
+            messages = state.values.get('messages', []) if state.values else []
+            if messages and isinstance(messages[-1], AIMessage) and messages[-1].tool_calls:
+                await self.graph.aupdate_state(config_params, {"messages": [
+                    ToolMessage(
+                        content="Cancelled: the user sent a new message before this tool call finished.",
+                        tool_call_id=call["id"],
+                        name=call["name"],
+                    )
+                    for call in messages[-1].tool_calls
+                ]}, as_node="tools")
+        except Exception as e:
+            logger.error("Could not close cancelled run on thread %s: %s", config_params["configurable"]["thread_id"], e)
+
+    async def _answer_scope(self) -> tuple:
+        """Everything besides the question and the data that an answer depends on"""
+        db_path = config.database_config['default_path']
+        snapshot = await run_in_tool_executor(schema_cache.get, db_path, config.tool_get_schema)
+        return (os.path.abspath(db_path), snapshot.schema_version, self.system_prompt_hash, config.llm_config.get('model'))
+
+    async def _cached_answer(self, query: str, config_params: dict) -> Optional[str]:
+        """Answer a repeated question from the answer cache, re-running its SQL for current numbers"""
+        if self.answer_cache_config.get('standalone_only', True):
+            # Same rule as _remember_answer: a follow-up needs its conversation,
+            # even when it reads like a cached standalone question
+            state = await self.graph.aget_state(config_params)
+            if state.values and state.values.get('messages'):
+                return None
+        key, entry = self.answer_cache.get(query, await self._answer_scope())
+        if entry is None:
+            return None
+        fresh = await run_in_tool_executor(execute_sql_query.func, entry["sql"], entry["max_results"])
+        if "error" in fresh:
+            self.answer_cache.invalidate(key)
+            return None
+        # Compare in the JSON form the cached results went through as a tool message
+        fresh_results = json.loads(json.dumps(fresh["results"], default=str))
+        answer = entry["answer"]
+        if fresh_results != entry["results"]:
+            answer = render_refreshed_answer(entry["sql"], fresh)
+            self.answer_cache.refresh(key, answer, fresh_results)
+        # Record the exchange in the thread so follow-up questions have context
+        await self.graph.aupdate_state(
+            config_params,
+            {"messages": [HumanMessage(content=query), AIMessage(content=answer)]},
+            as_node="assistant",
+        )
+        logger.info("Answered from the answer cache: %s", query)
+        return answer
+
+    async def _remember_answer(self, query: str, messages: List) -> None:
+        """Cache the answer to a question along with the last SQL it ran successfully"""
+        if self.answer_cache is None:
+            return
+        try:
+            turn_start = max(i for i, message in enumerate(messages) if isinstance(message, HumanMessage))
+            # Follow-ups ("and by country?") only make sense in their conversation
+            if self.answer_cache_config.get('standalone_only', True) and turn_start != 0:
+                return
+            turn = messages[turn_start:]
+            outputs = {message.tool_call_id: message for message in turn if isinstance(message, ToolMessage)}
+            sql_call, results = None, None
+            for message in turn:
+                for tool_call in getattr(message, 'tool_calls', None) or []:
+                    output = outputs.get(tool_call['id'])
+                    if tool_call['name'] != 'execute_sql_query' or output is None:
+                        continue
+                    try:
+                        payload = json.loads(output.content)
+                    except (TypeError, ValueError):
+                        continue
+                    if isinstance(payload, dict) and 'results' in payload and 'error' not in payload:
+                        sql_call, results = tool_call['args'], payload['results']
+            if sql_call is None:
+                return
+            self.answer_cache.put(
+                query, await self._answer_scope(), messages[-1].content,
+                sql_call['query'], results, sql_call.get('max_results'),
+            )
+        except Exception as e:
+            logger.error("Could not cache answer for %s: %s", query, e)
+
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        content = chunk.content
+        if isinstance(content, str):
+            return content
+        # Some providers stream a list of content blocks
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+        )
+
+    async def stream_query(self, query: str, thread_id=None) -> AsyncIterator[Dict[str, Any]]:
+        '''Same run as process_query, but yields frames while the graph runs:
+        ai_token for every generated text chunk, tool_started / tool_finished
+        around each tool call and a final ai_done with the complete answer.
+        '''
+        if not thread_id:
+            thread_id = config.assistant_config['process']['default_thread_id']
+        messages = [HumanMessage(content=query)]
+        config_params = {
+            "configurable": {
+                "thread_id": thread_id
+            }
+        }
+        with tracer.span("assistant.stream_query", session_id=thread_id, purpose=self.purpose, question=query) as span:
+            async with self._run(thread_id, config_params):
+                if self.answer_cache is not None:
+                    answer = await self._cached_answer(query, config_params)
+                    if answer is not None:
+                        span.set(cached=True)
+                        yield {"type": "ai_done", "content": answer, "cached": True}
+                        return
+                # aclosing: a consumer that stops early must stop the graph run too
+                events = self.graph.astream_events({"messages": messages}, config_params, version="v2")
+                async with aclosing(events):
+                    async for event in events:
+                        kind = event["event"]
+                        if kind == "on_chat_model_stream":
+                            if event["metadata"].get("langgraph_node") != "assistant" or SUMMARY_TAG in event.get("tags", []):
+                                continue
+                            text = self._chunk_text(event["data"]["chunk"])
+                            if text:
+                                yield {"type": "ai_token", "content": text}
+                        elif kind == "on_tool_start":
+                            yield {
+                                "type": "tool_started",
+                                "tool": event["name"],
+                                "runId": event["run_id"],
+                                "input": event["data"].get("input"),
+                            }
+                        elif kind == "on_tool_end":
+                            output = event["data"].get("output")
+                            yield {
+                                "type": "tool_finished",
+                                "tool": event["name"],
+                                "runId": event["run_id"],
+                                "output": getattr(output, "content", output),
+                            }
+                state = await self.graph.aget_state(config_params)
+                await self._remember_answer(query, state.values['messages'])
+
+        yield {"type": "ai_done", "content": state.values['messages'][-1].content}
+
@@ -1,7 +1,11 @@
-from fastapi import FastAPI, WebSocket, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from agents.sql_matic import SQLQueryAssistant
-from tools.get_schema import get_schema
+from tools.get_schema import read_schema
+from tools.async_tools import run_in_tool_executor
+from tools.schema_getters import schema_cache
+from tools.result_cache import result_cache
 from fastapi import Body
 import os
 from pathlib import Path
@@ -11,6 +15,14 @@ from evaluation_service import SQLEvaluationService
 from typing import Optional
 from logger import logger
 from chinook_db_creator import setup_chinook_db
+from services.checkpointer import close_checkpointer, open_checkpointer
+from services.session_manager import session_manager
+from services.answer_cache import answer_cache
+from services.llm_replay import RecordReplayLLM
+from services.metrics import metrics, websocket_sessions
+from services.tracing import tracer
+import asyncio
+from contextlib import aclosing
 
 app = FastAPI()
 regular_assistant = SQLQueryAssistant("regular")
@@ -33,9 +45,28 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def start_checkpointer():
+    # The Postgres backend can only be created on the running event loop
+    checkpointer = await open_checkpointer()
+    if regular_assistant.memory is not checkpointer:
+        for assistant in (regular_assistant, evaluator_assistant):
+            assistant.attach_checkpointer(checkpointer)
+        session_manager.attach_checkpointer(checkpointer)
+    app.state.session_sweeper = asyncio.create_task(session_manager.run_sweeper())
+
+
+@app.on_event("shutdown")
+async def stop_session_sweeper():
+    app.state.session_sweeper.cancel()
+    await close_checkpointer()
+    # Spans still queued for the sink
+    await asyncio.to_thread(tracer.close)
+
+
 @app.get("/schema")
 async def get_database_schema():
-    schema_result = get_schema("all")
+    schema_result = await run_in_tool_executor(read_schema, "all", "json")
 
     # Extract the actual schema data from the tool response
     if (
@@ -48,10 +79,11 @@ async def get_database_schema():
             logger.warning(
                 "Database schema returned empty tables array - attempting to recreate database"
             )
-            if setup_chinook_db():
+            if await run_in_tool_executor(setup_chinook_db):
                 logger.info("Successfully recreated the Chinook database")
+                schema_cache.invalidate()
                 # Try to get schema again after database recreation
-                schema_result = get_schema("all")
+                schema_result = await run_in_tool_executor(read_schema, "all", "json")
                 if (
                     isinstance(schema_result, dict)
                     and "schema" in schema_result
@@ -72,6 +104,67 @@ async def get_database_schema():
         return {"tables": []}
 
 
+def cache_stats() -> dict:
+    stats = {"result_cache": result_cache.stats(), "answer_cache": answer_cache.stats()}
+    for name, assistant in (("regular", regular_assistant), ("evaluator", evaluator_assistant)):
+        if isinstance(assistant.llm_with_tools, RecordReplayLLM):
+            stats[f"llm_replay_{name}"] = assistant.llm_with_tools.stats.as_dict()
+    return stats
+
+
+def cache_metrics() -> list:
+    """Cache counters for /metrics, read from the caches' own stats at scrape time"""
+    hits, misses, ratios = [], [], []
+    for name, stats in cache_stats().items():
+        labels = {"cache": name}
+        hit_count = stats.get("hits", stats.get("exact_hits", 0) + stats.get("near_duplicate_hits", 0))
+        hits.append((labels, hit_count))
+        misses.append((labels, stats.get("misses", 0)))
+        ratios.append((labels, stats.get("hit_rate", 0.0)))
+    return [
+        ("cache_hits_total", "counter", "Cache lookups answered from the cache", hits),
+        ("cache_misses_total", "counter", "Cache lookups that missed", misses),
+        ("cache_hit_ratio", "gauge", "Hits over lookups since startup", ratios),
+    ]
+
+
+metrics.register_collector(cache_metrics)
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss/eviction counters for the SQL result, answer and LLM replay caches"""
+    return cache_stats()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of the in-process metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/traces/{session_id}")
+async def get_traces(session_id: str):
+    """Span timelines of a session's requests: WebSocket message, assistant run, graph steps, LLM and tool calls"""
+    traces = await asyncio.to_thread(tracer.traces, session_id)
+    if not traces:
+        raise HTTPException(status_code=404, detail=f"No traces for session {session_id}")
+    return {"session_id": session_id, "traces": traces}
+
+
+@app.get("/admin/sessions")
+async def get_sessions():
+    """Conversation threads held by this worker, heaviest first"""
+    return session_manager.stats()
+
+
+@app.delete("/admin/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not await session_manager.evict(session_id):
+        raise HTTPException(status_code=409, detail="Session has a run in progress")
+    return {"status": "success", "session_id": session_id}
+
+
 @app.get("/config")
 async def get_config():
     """Get the content of the config.yaml file"""
@@ -128,14 +221,15 @@ async def update_config(data: dict = Body(...)):
 
 
 @app.get("/evaluate")
-async def evaluate_assistant_endpoint(num_queries: Optional[int] = None):
+async def evaluate_assistant_endpoint(num_queries: Optional[int] = None, force: bool = False):
     """Run evaluation of SQL assistant against ground truth data"""
     try:
-        logger.info("Starting evaluation with num_queries=%s", num_queries)
+        logger.info("Starting evaluation with num_queries=%s force=%s", num_queries, force)
         eval_service = SQLEvaluationService()
         results = await eval_service.evaluate_assistant(
-            evaluator_assistant, num_queries
+            evaluator_assistant, num_queries, force=force
         )
+        logger.info("Reused %s stored answers", results.get("reused_cases", 0))
         logger.info("Evaluation completed. Results: %s", list(results.keys()))
         if "error" in results:
             logger.error("Evaluation error: %s", results["error"])
@@ -148,9 +242,55 @@ async def evaluate_assistant_endpoint(num_queries: Optional[int] = None):
         raise HTTPException(status_code=500, detail=f"Evaluation failed: {str(e)}")
 
 
+async def answer_message(websocket: WebSocket, message: str, session_id: str, stream: bool):
+    """Run the assistant for one chat message and send its frames"""
+    answered = False
+    try:
+        # Runs of a session wait for the previous one, in this worker or another
+        async with session_manager.exclusive(session_id):
+            # One trace per message, served at /traces/{session_id}
+            with tracer.span("websocket.message", session_id=session_id, message=message):
+                if stream:
+                    # ai_token / tool_started / tool_finished frames, then ai_done
+                    # aclosing: a cancel while sending a frame must still stop the run
+                    # before the session lock is released
+                    async with aclosing(regular_assistant.stream_query(message, session_id)) as frames:
+                        async for frame in frames:
+                            frame["sessionId"] = session_id
+                            await websocket.send_json(frame)
+                    answered = True
+                    return
+
+                # Process message with the session ID as thread_id
+                response = await regular_assistant.process_query(message, session_id)
+
+                # Send response back to client
+                await websocket.send_json(
+                    {"type": "ai_response", "content": response, "sessionId": session_id}
+                )
+                answered = True
+    except asyncio.CancelledError:
+        if answered:
+            # Cancelled while handing the thread over to the next run
+            raise
+        logger.info("Cancelled run for session %s: %s", session_id, message)
+        try:
+            await websocket.send_json({"type": "cancelled", "sessionId": session_id})
+        except Exception:
+            pass  # The client is gone
+        raise
+    except Exception as e:
+        logger.error("Error in session %s: %s", session_id, e)
+        try:
+            await websocket.send_json({"type": "error", "content": str(e), "sessionId": session_id})
+        except Exception:
+            pass
+
+
 @app.websocket("/ws/chat")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    websocket_sessions.inc()
 
     # Extract session_id from query parameters or generate new one
     query_params = dict(websocket.query_params)
@@ -163,10 +303,27 @@ async def websocket_endpoint(websocket: WebSocket):
     else:
         logger.info("Using provided session ID: %s", session_id)
 
+    # Clients opt in to incremental frames with ?stream=true or a "stream"
+    # flag on a message; everyone else gets the single ai_response message
+    stream_default = query_params.get("stream", "").lower() in ("1", "true", "yes")
+
+    # The socket keeps being read while a message is answered: a new message
+    # or a {"type": "cancel"} frame cancels the run in flight, which stops its
+    # LLM call and interrupts its SQL
+    in_flight: Optional[asyncio.Task] = None
     try:
         while True:
             # Receive message from client
             data = await websocket.receive_json()
+
+            # A run already cancelled is still cleaning up; cancelling it again
+            # would cut that short and report it twice
+            if in_flight is not None and not in_flight.done() and not in_flight.cancelling():
+                in_flight.cancel()
+            if data.get("type") == "cancel":
+                logger.info("Cancel requested for session %s", session_id)
+                continue
+
             message = data.get("message", "")
 
             # Client might send session_id in the message too
@@ -177,20 +334,25 @@ async def websocket_endpoint(websocket: WebSocket):
                 logger.info("Updated session ID from message: %s", session_id)
 
             logger.info("Processing message for session %s: %s", session_id, message)
-
-            # Process message with the session ID as thread_id
-            response = await regular_assistant.process_query(message, session_id)
-
-            # Send response back to client
-            await websocket.send_json(
-                {"type": "ai_response", "content": response, "sessionId": session_id}
+            in_flight = asyncio.create_task(
+                answer_message(websocket, message, session_id, data.get("stream", stream_default))
             )
 
+    except WebSocketDisconnect:
+        logger.info("Client disconnected from session %s", session_id)
     except Exception as e:
         logger.error("Error in session %s: %s", session_id, e)
     finally:
+        if in_flight is not None and not in_flight.done():
+            in_flight.cancel()
+            # Let the run close its thread state before the connection goes
+            await asyncio.gather(in_flight, return_exceptions=True)
+        websocket_sessions.dec()
         logger.info("WebSocket connection closed for session ID: %s", session_id)
-        await websocket.close()
+        try:
+            await websocket.close()
+        except RuntimeError:
+            pass  # Already closed by the client
 
 
 @app.post("/update-db")
@@ -0,0 +1,81 @@
+import csv
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from tools.data_dictionary_index import get_data_dictionary_index
+
+NUM_ROWS = 100_000
+NUM_LOOKUPS = 200
+COLUMNS = ['Table Name', 'Column Name', 'Data Type', 'Description']
+NAME_COLUMNS = ['Column Name', 'Table Name']
+
+
+def create_dictionary(path: str, num_rows: int = NUM_ROWS):
+    """Write an enterprise-sized dictionary: ~2,000 tables of 50 columns each"""
+    rng = random.Random(42)
+    words = ['ACCT', 'CUST', 'PREM', 'BILL', 'SVC', 'ADJ', 'PAY', 'METER', 'READ', 'RATE', 'ORD', 'ITEM']
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for i in range(num_rows):
+            table = f"CI_{words[(i // 50) % len(words)]}_{i // 50}"
+            column = f"{rng.choice(words)}_{rng.choice(words)}_{i % 50}_ID"
+            writer.writerow([table, column, 'CHAR(10)', f"Identifier {i} for {table.lower()} records"])
+
+
+def legacy_lookup(path: str, term: str):
+    """What get_db_field_definition used to do on every call"""
+    df = pd.read_csv(path)
+    return df[df['Column Name'].str.contains(term, case=False, na=False)].head(5).to_dict('records')
+
+
+def time_lookups(func, terms):
+    timings = []
+    for term in terms:
+        start = time.perf_counter()
+        func(term)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings), statistics.quantiles(timings, n=100)[94]
+
+
+def main():
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'dictionary.csv')
+        print(f"Creating data dictionary with {NUM_ROWS} rows...")
+        create_dictionary(path)
+
+        start = time.perf_counter()
+        get_data_dictionary_index(path, NAME_COLUMNS, COLUMNS)
+        print(f"Index build: {(time.perf_counter() - start) * 1000:.1f} ms (once per file mtime)")
+
+        terms = [
+            rng.choice(['ACCT_BILL_1', 'CUST', 'METER_READ', 'PAY_RATE_49_ID', 'CI_ORD_11', 'SVC_ADJ'])
+            for _ in range(NUM_LOOKUPS)
+        ]
+
+        def indexed_lookup(term):
+            return get_data_dictionary_index(path, NAME_COLUMNS, COLUMNS).search(term, 5)
+
+        legacy_median, legacy_p95 = time_lookups(lambda term: legacy_lookup(path, term), terms[:20])
+        indexed_median, indexed_p95 = time_lookups(indexed_lookup, terms)
+
+        print(f"{'mode':<10}{'median us':>14}{'p95 us':>14}")
+        print(f"{'pandas':<10}{legacy_median:>14.1f}{legacy_p95:>14.1f}")
+        print(f"{'index':<10}{indexed_median:>14.1f}{indexed_p95:>14.1f}")
+        print(f"Speedup: {legacy_median / indexed_median:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+# The offline model needs no API key; set before config is first imported
+os.environ.setdefault("LLM_MODEL", "fake")
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import AIMessage, HumanMessage
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+
+# Before the assistants and the app are imported: services.session_manager builds
+# the process-wide checkpointer on import. In memory, so a run never writes to
+# backend/cache and graph steps exclude checkpoint I/O
+config.checkpointer_config["backend"] = "memory"
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+ITERATIONS = 30
+QUESTION = "Which genres sold the most tracks?"
+SALES_SQL = (
+    "SELECT g.Name, SUM(il.Quantity) AS sold FROM InvoiceLine il "
+    "JOIN Track t ON t.TrackId = il.TrackId JOIN Genre g ON g.GenreId = t.GenreId "
+    "GROUP BY g.Name ORDER BY sold DESC"
+)
+# Scripted agent run: schema, data dictionary, the query, then the answer
+SCRIPT = [{
+    "match": "genres sold",
+    "steps": [
+        {"tool_calls": [{"name": "get_schema", "args": {"table_name": "all"}}]},
+        {"tool_calls": [{"name": "get_db_field_definition", "args": {"column_name": "GenreId"}}]},
+        {"tool_calls": [{"name": "execute_sql_query", "args": {"query": SALES_SQL}}]},
+        {"content": "Top genres by tracks sold:\n{tool_output}\n\nUsed SQL:\n```sql\n{sql}\n```"},
+    ],
+}]
+
+
+def create_database(db_path: str, tracks: int):
+    """Chinook-shaped database whose fact tables scale with tracks"""
+    rng = random.Random(42)
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE Artist (ArtistId INTEGER PRIMARY KEY, Name NVARCHAR(120));
+        CREATE TABLE Album (AlbumId INTEGER PRIMARY KEY, Title NVARCHAR(160) NOT NULL,
+            ArtistId INTEGER NOT NULL REFERENCES Artist(ArtistId));
+        CREATE TABLE Genre (GenreId INTEGER PRIMARY KEY, Name NVARCHAR(120));
+        CREATE TABLE Track (TrackId INTEGER PRIMARY KEY, Name NVARCHAR(200) NOT NULL,
+            AlbumId INTEGER REFERENCES Album(AlbumId), GenreId INTEGER REFERENCES Genre(GenreId),
+            Milliseconds INTEGER NOT NULL, UnitPrice NUMERIC(10,2) NOT NULL);
+        CREATE TABLE Customer (CustomerId INTEGER PRIMARY KEY, FirstName NVARCHAR(40) NOT NULL,
+            LastName NVARCHAR(20) NOT NULL, Country NVARCHAR(40));
+        CREATE TABLE Invoice (InvoiceId INTEGER PRIMARY KEY, CustomerId INTEGER NOT NULL REFERENCES Customer(CustomerId),
+            InvoiceDate DATETIME NOT NULL, Total NUMERIC(10,2) NOT NULL);
+        CREATE TABLE InvoiceLine (InvoiceLineId INTEGER PRIMARY KEY, InvoiceId INTEGER NOT NULL REFERENCES Invoice(InvoiceId),
+            TrackId INTEGER NOT NULL REFERENCES Track(TrackId), UnitPrice NUMERIC(10,2) NOT NULL, Quantity INTEGER NOT NULL);
+        CREATE INDEX IFK_TrackGenreId ON Track (GenreId);
+        CREATE INDEX IFK_InvoiceLineTrackId ON InvoiceLine (TrackId);
+    """)
+    artists, albums, customers, invoices = max(tracks // 100, 1), max(tracks // 10, 1), max(tracks // 20, 1), max(tracks // 5, 1)
+    conn.executemany("INSERT INTO Artist VALUES (?, ?)", ((i, f"Artist {i}") for i in range(1, artists + 1)))
+    conn.executemany("INSERT INTO Album VALUES (?, ?, ?)",
+                     ((i, f"Album {i}", rng.randint(1, artists)) for i in range(1, albums + 1)))
+    conn.executemany("INSERT INTO Genre VALUES (?, ?)", ((i, f"Genre {i}") for i in range(1, 26)))
+    conn.executemany("INSERT INTO Track VALUES (?, ?, ?, ?, ?, ?)", (
+        (i, f"Track {i}", rng.randint(1, albums), rng.randint(1, 25), rng.randint(60_000, 600_000), 0.99)
+        for i in range(1, tracks + 1)
+    ))
+    conn.executemany("INSERT INTO Customer VALUES (?, ?, ?, ?)",
+                     ((i, f"First {i}", f"Last {i}", rng.choice(["USA", "Canada", "Brazil", "France"])) for i in range(1, customers + 1)))
+    conn.executemany("INSERT INTO Invoice VALUES (?, ?, ?, ?)",
+                     ((i, rng.randint(1, customers), f"2024-{rng.randint(1, 12):02d}-01", 0.99) for i in range(1, invoices + 1)))
+    conn.executemany("INSERT INTO InvoiceLine VALUES (?, ?, ?, ?, ?)", (
+        (i, rng.randint(1, invoices), rng.randint(1, tracks), 0.99, rng.randint(1, 3))
+        for i in range(1, tracks + 1)
+    ))
+    conn.commit()
+    conn.close()
+
+
+def percentiles(samples) -> dict:
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"n": len(samples), "p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+class ToolTimer(AsyncCallbackHandler):
+    """Wall time spent inside tools during one graph run"""
+
+    def __init__(self):
+        self.started = {}
+        self.total = 0.0
+
+    async def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self.started[run_id] = time.perf_counter()
+
+    async def on_tool_end(self, output, *, run_id, **kwargs):
+        self.total += time.perf_counter() - self.started.pop(run_id)
+
+    async def on_tool_error(self, error, *, run_id, **kwargs):
+        self.total += time.perf_counter() - self.started.pop(run_id)
+
+
+async def bench_graph_steps(assistant, iterations: int) -> list:
+    """Per-step time of the graph with a zero-latency model and tool time subtracted: nodes, routing, checkpointing"""
+    samples = []
+    # The first run pays for imports, graph compilation caches and the schema retriever fit
+    for iteration in range(iterations + 1):
+        timer = ToolTimer()
+        run_config = {"configurable": {"thread_id": f"bench-{uuid.uuid4()}"}, "callbacks": [timer]}
+        start = time.perf_counter()
+        result = await assistant.graph.ainvoke({"messages": [HumanMessage(content=QUESTION)]}, run_config)
+        elapsed = time.perf_counter() - start
+        steps = sum(isinstance(message, AIMessage) for message in result["messages"])
+        if iteration:
+            samples.append((elapsed - timer.total) / steps * 1000)
+    return samples
+
+
+def bench_tools(iterations: int) -> dict:
+    from tools.execute_sql import execute_sql_query
+    from tools.get_schema import get_schema
+    from tools.query_data_dictionary import get_db_field_definition
+
+    calls = {
+        "get_schema": lambda: get_schema.func("all"),
+        "execute_sql_query": lambda: execute_sql_query.func(SALES_SQL),
+        "get_db_field_definition": lambda: get_db_field_definition.func("GenreId"),
+    }
+    timings = {}
+    for name, call in calls.items():
+        call()  # Warm the schema cache, connection pool and dictionary index
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            call()
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[f"tool.{name}"] = samples
+    return timings
+
+
+def bench_websocket(iterations: int) -> list:
+    from fastapi.testclient import TestClient
+    from app import app
+
+    samples = []
+    with TestClient(app) as client, client.websocket_connect("/ws/chat") as websocket:
+        for iteration in range(iterations + 1):
+            start = time.perf_counter()
+            websocket.send_json({"message": QUESTION, "sessionId": f"bench-{uuid.uuid4()}"})
+            response = websocket.receive_json()
+            assert response["type"] == "ai_response", response
+            if iteration:
+                samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def run(sizes, iterations: int) -> dict:
+    from agents.sql_matic import SQLQueryAssistant
+    from tools.schema_getters import schema_cache
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        script_path = os.path.join(tmpdir, "script.yaml")
+        with open(script_path, "w") as f:
+            json.dump(SCRIPT, f)  # JSON is valid YAML
+        # Measure the uncached path: every run reaches the graph and SQLite
+        config.llm_config["fake"] = {"script": script_path, "latency_ms": 0, "token_latency_ms": 0}
+        config.assistant_config.setdefault("answer_cache", {})["enabled"] = False
+        config.tool_execute_sql.setdefault("result_cache", {})["enabled"] = False
+        assistant = SQLQueryAssistant("regular")
+
+        for size in sizes:
+            db_path = os.path.join(tmpdir, f"chinook_{size}.db")
+            create_database(db_path, size)
+            config.database_config["default_path"] = db_path
+            schema_cache.invalidate()
+            print(f"Database with {size} tracks: {db_path}", file=sys.stderr)
+
+            timings = {"graph_step": asyncio.run(bench_graph_steps(assistant, iterations))}
+            timings.update(bench_tools(iterations))
+            timings["ws_round_trip"] = bench_websocket(iterations)
+            for metric, samples in timings.items():
+                results[f"{size}/{metric}"] = percentiles(samples)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list:
+    """Metrics whose p95 grew by more than threshold (and min_delta_ms) over the baseline"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        delta = current["p95"] - previous["p95"]
+        if delta > min_delta_ms and current["p95"] > previous["p95"] * (1 + threshold):
+            regressions.append(f"{key}: p95 {previous['p95']:.2f} -> {current['p95']:.2f} ms (+{delta / previous['p95']:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency of the assistant with the offline model")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES), help="Comma-separated track counts")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--baseline", help="JSON results of an earlier run to check for regressions")
+    parser.add_argument("--save", help="Write the results as JSON, e.g. to become the next baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative p95 growth")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore p95 growth below this")
+    args = parser.parse_args()
+
+    results = run([int(size) for size in args.sizes.split(",")], args.iterations)
+
+    print(f"{'metric':<40}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for key, stats in results.items():
+        print(f"{key:<40}{stats['n']:>5}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
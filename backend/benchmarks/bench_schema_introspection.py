@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from tools.schema_getters import SQLiteSchemaGetter
+
+NUM_TABLES = 500
+REPEATS = 10
+
+
+def create_synthetic_db(db_path: str, num_tables: int = NUM_TABLES):
+    """Create a warehouse-style database with FKs and indexes on every table"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    for i in range(num_tables):
+        parent = f"REFERENCES table_{i - 1}(id)" if i else ""
+        cursor.execute(f"""
+            CREATE TABLE table_{i} (
+                id INTEGER PRIMARY KEY,
+                parent_id INTEGER {parent},
+                code TEXT NOT NULL UNIQUE,
+                name TEXT,
+                amount REAL,
+                created_at TEXT
+            )
+        """)
+        cursor.execute(f"CREATE INDEX idx_table_{i}_name ON table_{i}(name, created_at)")
+    conn.commit()
+    conn.close()
+
+
+def time_call(func, repeats: int = REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), min(timings)
+
+
+def main():
+    config = {
+        "exclude_system_tables": True,
+        "include_relationships": True,
+        "include_indexes": True,
+        "max_tables": NUM_TABLES,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "synthetic.db")
+        print(f"Creating synthetic database with {NUM_TABLES} tables...")
+        create_synthetic_db(db_path)
+
+        getter = SQLiteSchemaGetter(db_path=db_path, config=config)
+
+        # Both modes must describe the same schema (bulk adds index column lists)
+        bulk_schema = getter.get_schema_bulk()
+        loop_schema = getter.get_schema_per_table()
+        for index in bulk_schema["indexes"]:
+            index.pop("columns")
+        assert bulk_schema == loop_schema, "bulk and per-table introspection disagree"
+
+        loop_median, loop_min = time_call(getter.get_schema_per_table)
+        bulk_median, bulk_min = time_call(getter.get_schema_bulk)
+
+        print(f"{'mode':<12}{'median ms':>12}{'min ms':>12}")
+        print(f"{'per_table':<12}{loop_median:>12.2f}{loop_min:>12.2f}")
+        print(f"{'bulk':<12}{bulk_median:>12.2f}{bulk_min:>12.2f}")
+        print(f"Speedup: {loop_median / bulk_median:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+from tools.schema_retrieval import get_schema_retriever
+
+_TABLE_REFERENCE = re.compile(r'\b(?:FROM|JOIN)\s+["`\[]?([A-Za-z_][\w]*)', re.IGNORECASE)
+K_VALUES = [1, 2, 3, 5]
+
+
+def referenced_tables(sql: str, table_names) -> set:
+    """Tables a ground-truth query reads, matched case-insensitively against the schema"""
+    by_lower = {name.lower(): name for name in table_names}
+    return {by_lower[name.lower()] for name in _TABLE_REFERENCE.findall(sql) if name.lower() in by_lower}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k of relevant-table retrieval on the ground-truth questions")
+    parser.add_argument("--db", default=config.database_config.get("default_path"), help="Chinook database path")
+    parser.add_argument("--ground-truth", default=str(project_root / "chinookdb_groundtruth.csv"))
+    args = parser.parse_args()
+
+    retriever = get_schema_retriever(args.db)
+    df = pd.read_csv(args.ground_truth, sep="|")
+    cases = [
+        (question, referenced_tables(sql, retriever.table_names))
+        for question, sql in zip(df["User Input"], df["Ground Truth SQL"])
+    ]
+    cases = [(question, gold) for question, gold in cases if gold]
+    full_schema_chars = len(json.dumps(retriever.snapshot.schema, separators=(",", ":")))
+    print(f"{len(cases)} questions, {len(retriever.table_names)} tables, full schema {full_schema_chars} chars")
+
+    print(f"{'k':>3}{'neighbours':>12}{'recall':>9}{'all found':>11}{'avg tables':>12}{'avg chars':>11}")
+    for k in K_VALUES:
+        for include_neighbours in (False, True):
+            recalls, complete, sizes, chars = [], 0, [], []
+            for question, gold in cases:
+                selected = {entry["table"] for entry in retriever.retrieve(question, top_k=k, include_neighbours=include_neighbours)}
+                found = len(gold & selected)
+                recalls.append(found / len(gold))
+                complete += found == len(gold)
+                sizes.append(len(selected))
+                chars.append(sum(len(json.dumps(retriever.snapshot.table(name), separators=(",", ":"))) for name in selected))
+            print(f"{k:>3}{'yes' if include_neighbours else 'no':>12}{sum(recalls) / len(recalls):>9.2f}"
+                  f"{complete / len(cases):>11.2f}{sum(sizes) / len(sizes):>12.1f}{sum(chars) / len(chars):>11.0f}")
+
+    misses = [
+        (question, sorted(gold - {entry["table"] for entry in retriever.retrieve(question, top_k=3)}))
+        for question, gold in cases
+    ]
+    misses = [(question, missing) for question, missing in misses if missing]
+    if misses:
+        print("\nMissed at k=3 with neighbours:")
+        for question, missing in misses:
+            print(f"  {question}  ->  {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from langchain_core.messages import ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+from tools.schema_getters import SQLiteSchemaGetter, SchemaSnapshot
+
+
+def token_counter():
+    """tiktoken's o200k_base when it is available, LangChain's approximation otherwise"""
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("o200k_base")
+        return "o200k_base", lambda text: len(encoding.encode(text))
+    except Exception:
+        return "approximate", lambda text: count_tokens_approximately([ToolMessage(content=text, tool_call_id="x")])
+
+
+def build_store_db(directory: str) -> str:
+    """Run store_db_creator.py from a copy, since it writes Chinook.db next to itself"""
+    script = Path(directory) / "store_db_creator.py"
+    shutil.copy(project_root / "store_db_creator.py", script)
+    subprocess.run([sys.executable, str(script)], check=True, cwd=directory, capture_output=True)
+    return str(Path(directory) / "Chinook.db")
+
+
+def measure(db_path: str, count):
+    snapshot = SchemaSnapshot(SQLiteSchemaGetter(db_path, config.tool_get_schema).get_schema(), 0, None)
+    # What the tool message carries: the dict as ToolNode serializes it vs the compact text
+    renderings = {
+        "json": json.dumps(snapshot.schema, ensure_ascii=False),
+        "compact": snapshot.compact(),
+    }
+    return snapshot, {name: (len(text), count(text)) for name, text in renderings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Size of the get_schema('all') output, JSON vs compact")
+    parser.add_argument("--chinook", default=config.database_config.get("default_path"), help="Chinook database path")
+    parser.add_argument("--store", help="Store database path; built with store_db_creator.py when omitted")
+    parser.add_argument("--show", action="store_true", help="Print the compact rendering of each database")
+    args = parser.parse_args()
+
+    counter_name, count = token_counter()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        databases = {"chinook": args.chinook, "store": args.store or build_store_db(tmpdir)}
+        print(f"Token counter: {counter_name}")
+        print(f"{'database':<10}{'tables':>8}{'json chars':>12}{'json tokens':>13}"
+              f"{'compact chars':>15}{'compact tokens':>16}{'saved':>8}")
+        for name, db_path in databases.items():
+            snapshot, sizes = measure(db_path, count)
+            json_chars, json_tokens = sizes["json"]
+            compact_chars, compact_tokens = sizes["compact"]
+            saved = 1 - compact_tokens / json_tokens if json_tokens else 0.0
+            print(f"{name:<10}{len(snapshot.table_names):>8}{json_chars:>12}{json_tokens:>13}"
+                  f"{compact_chars:>15}{compact_tokens:>16}{saved:>8.0%}")
+            if args.show:
+                print(snapshot.compact())
+
+
+if __name__ == "__main__":
+    main()
@@ -40,10 +40,14 @@ class Config:
                 self._config = yaml.safe_load(f)
         except Exception as e:
             raise ConfigurationError(f"Failed to load config.yaml: {str(e)}")
+        # CI and benchmarks switch to the offline model without editing the file
+        if os.getenv("LLM_MODEL"):
+            self._config.setdefault('llm', {})['model'] = os.getenv("LLM_MODEL")
 
     def _validate_config(self):
         """Validate required configuration"""
-        if not self.openai_api_key:
+        model = str(self.llm_config.get('model', ''))
+        if not self.openai_api_key and not (model == 'fake' or model.startswith('fake:')):
             raise ConfigurationError("OPENAI_API_KEY not found in environment variables")
 
     @property
@@ -78,6 +82,22 @@ class Config:
     def tool_get_schema(self) -> Dict[str, Any]:
         return self._config.get('tool_get_schema', {})
 
+    @property
+    def tool_executor_config(self) -> Dict[str, Any]:
+        return self._config.get('tool_executor', {})
+
+    @property
+    def checkpointer_config(self) -> Dict[str, Any]:
+        return self._config.get('checkpointer', {})
+
+    @property
+    def session_config(self) -> Dict[str, Any]:
+        return self._config.get('sessions', {})
+
+    @property
+    def tracing_config(self) -> Dict[str, Any]:
+        return self._config.get('tracing', {})
+
     @property
     def assistant_config(self) -> Dict[str, Any]:
         return self._config.get('assistant', {})
@@ -1,13 +1,20 @@
+import asyncio
+import re
+import uuid
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import time
 import os
-from typing import Dict, Any, Optional
-from sklearn.metrics.pairwise import cosine_similarity
+from typing import Dict, Any, List, Optional
 from sklearn.feature_extraction.text import TfidfVectorizer
 
 from config import config
+from services.execution_match import ExecutionMatcher
+from services.evaluation_store import get_evaluation_store
+from services.llm_replay import RecordReplayLLM, replay_run_stats
+from tools.async_tools import run_in_tool_executor
+from tools.schema_getters import schema_cache
 
 class SQLEvaluationService:
     def __init__(self):
@@ -26,39 +33,79 @@ class SQLEvaluationService:
             self.ground_truth_path = Path(__file__).parent / path_from_config[9:]
         
         print(f"Looking for ground truth file at: {self.ground_truth_path}")
-        self.vectorizer = TfidfVectorizer(lowercase=True, strip_accents='unicode')
+
+        store_path = config.evaluation_config.get('store_path')
+        self.store = get_evaluation_store(str(Path(__file__).parent / store_path)) if store_path else None
+
+    @staticmethod
+    async def _case_key_parts(assistant) -> Dict[str, Any]:
+        """Everything besides the question that can change an assistant's answer"""
+        db_path = config.database_config.get('default_path', 'database.db')
+        # A cold schema cache reads the database; keep that off the event loop
+        snapshot = await run_in_tool_executor(schema_cache.get, db_path, config.tool_get_schema)
+        return {
+            "model": config.llm_config.get('model'),
+            "temperature": config.llm_config.get('temperature'),
+            "system_prompt_hash": getattr(assistant, 'system_prompt_hash', ''),
+            "schema_version": f"{os.path.abspath(db_path)}:{snapshot.schema_version}",
+        }
+
+    # Vectorizers fitted on a ground-truth corpus, shared across evaluation runs
+    _vectorizers: Dict[int, TfidfVectorizer] = {}
+
+    @classmethod
+    def _fitted_vectorizer(cls, ground_truth_corpus: List[str]) -> TfidfVectorizer:
+        """One TF-IDF vocabulary/IDF for the whole ground-truth set, so scores are comparable across questions"""
+        key = hash(tuple(ground_truth_corpus))
+        vectorizer = cls._vectorizers.get(key)
+        if vectorizer is None:
+            vectorizer = TfidfVectorizer(lowercase=True, strip_accents='unicode')
+            vectorizer.fit(ground_truth_corpus)
+            if len(cls._vectorizers) >= 8:
+                cls._vectorizers.clear()
+            cls._vectorizers[key] = vectorizer
+        return vectorizer
+
+    def score_similarities(self, assistant_sqls: List[str], ground_truth_sqls: List[str],
+                           ground_truth_corpus: List[str]) -> np.ndarray:
+        """Row-wise cosine similarity of each generated SQL with its ground truth.
+        TF-IDF rows are L2-normalized, so cosine is the sum of the element-wise product."""
+        vectorizer = self._fitted_vectorizer(ground_truth_corpus)
+        generated = vectorizer.transform(assistant_sqls)
+        expected = vectorizer.transform(ground_truth_sqls)
+        return np.clip(np.asarray(generated.multiply(expected).sum(axis=1)).ravel(), 0.0, 1.0)
     
-    def extract_sql_from_response(self, response: str) -> str:
-        """Extract SQL query from assistant's response"""
-        response_lower = response.lower()
+    def extract_sql_from_response(self, response: str, preserve_case: bool = False) -> str:
+        """Extract SQL query from assistant's response.
+        Lower-cased by default; preserve_case keeps literals intact for execution."""
         assistant_sql = ""
         #TODO We should add an output parser or system prompt to ensure the response is pure sql
         # Check for SQL keywords
         sql_markers = ["select", "insert", "update", "delete", "with"]
-        for line in response_lower.split('\n'):
+        for line in response.split('\n'):
             line = line.strip()
-            if any(line.startswith(marker) for marker in sql_markers):
+            if any(line.lower().startswith(marker) for marker in sql_markers):
                 assistant_sql = line
                 break
         
         # If no SQL found, try code blocks
         if not assistant_sql:
-            if "```sql" in response_lower:
-                sql_block = response_lower.split("```sql")[1].split("```")[0]
-                assistant_sql = sql_block.strip()
-            elif "```" in response_lower:
-                sql_block = response_lower.split("```")[1].split("```")[0]
-                assistant_sql = sql_block.strip()
+            sql_block = re.search(r"```sql(.*?)(?:```|$)", response, re.IGNORECASE | re.DOTALL)
+            if not sql_block:
+                sql_block = re.search(r"```(.*?)(?:```|$)", response, re.DOTALL)
+            if sql_block:
+                assistant_sql = sql_block.group(1).strip()
                 
-        return assistant_sql
+        return assistant_sql if preserve_case else assistant_sql.lower()
 
-    async def evaluate_assistant(self, assistant, num_queries: Optional[int] = None) -> Dict[str, Any]:
+    async def evaluate_assistant(self, assistant, num_queries: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
         """
         Evaluates SQL assistant's performance against ground truth data.
         
         Args:
             assistant: SQL assistant instance with process_query method
             num_queries: Number of queries to evaluate. If None, evaluates all queries.
+            force: Ask the LLM again even for cases with a stored answer.
             
         Returns:
             Dict[str, Any]: Evaluation metrics and results
@@ -111,6 +158,7 @@ class SQLEvaluationService:
             print(f"Loaded {len(df)} rows from CSV. Columns: {df.columns.tolist()}")
             print(f"First row: {df.iloc[0].tolist()}")
             
+            ground_truth_corpus = df["Ground Truth SQL"].dropna().astype(str).str.lower().str.strip().tolist()
             if num_queries:
                 df = df.head(num_queries)
         except Exception as e:
@@ -135,60 +183,166 @@ class SQLEvaluationService:
             "success_rate": 0.0,
             "similarities": [],
             "failed_cases": [],
-            "execution_time": 0.0
+            "execution_time": 0.0,
+            "average_latency": 0.0,
+            "p95_latency": 0.0,
+            "reused_cases": 0
         }
 
         start_time = time.time()
 
-        for idx, row in df.iterrows():
-            try:
-                assistant_result = await assistant.process_query(row["User Input"])
-                assistant_sql = self.extract_sql_from_response(assistant_result)
-                ground_truth_sql = row["Ground Truth SQL"].lower().strip()
+        # Questions run concurrently, each in its own thread so histories never mix;
+        # gather keeps the original order for aggregation
+        run_id = uuid.uuid4().hex[:8]
+        semaphore = asyncio.Semaphore(config.evaluation_config.get('max_concurrency', 8))
+        # similarity: TF-IDF cosine against the ground-truth text
+        # execution: both queries are run and their result sets compared
+        scoring = config.evaluation_config.get('scoring', 'similarity')
+        matcher = ExecutionMatcher() if scoring == "execution" else None
+        # Stored answers are reused unless the model, prompt, question or schema changed
+        key_parts = await self._case_key_parts(assistant)
+        # Replay hits/misses of this run only; the case tasks inherit the context
+        try:
+            with replay_run_stats() as replay_stats:
+                cases = await asyncio.gather(*[
+                    self._evaluate_case(assistant, idx, question, ground_truth_sql, f"eval-{run_id}-{idx + 1}", semaphore,
+                                        matcher, key_parts, force)
+                    for idx, (question, ground_truth_sql) in enumerate(zip(df["User Input"], df["Ground Truth SQL"]))
+                ])
+        finally:
+            if matcher is not None:
+                matcher.close()
+        results["reused_cases"] = sum(1 for case in cases if case.get("reused"))
 
-                if assistant_sql and ground_truth_sql:
-                    tfidf_matrix = self.vectorizer.fit_transform([assistant_sql, ground_truth_sql])
-                    similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
-                    
-                    case_data = {
-                        "query_id": idx + 1,
-                        "query": row["User Input"],
-                        "similarity": similarity,
-                        "assistant_sql": assistant_sql,
-                        "ground_truth_sql": ground_truth_sql
-                    }
-                    
-                    results["similarities"].append(case_data)
-                    
-                    if similarity >= config.evaluation_config.get('similarity_threshold', 0.8):
-                        results["successful_queries"] += 1
-                    else:
-                        results["failed_queries"] += 1
-                        results["failed_cases"].append(case_data)
-                else:
-                    results["failed_queries"] += 1
-                    results["failed_cases"].append({
-                        "query_id": idx + 1,
-                        "query": row["User Input"],
-                        "error": "No SQL query found in response"
-                    })
-                    
-            except Exception as e:
-                results["failed_queries"] += 1
-                results["failed_cases"].append({
-                    "query_id": idx + 1,
-                    "query": row["User Input"],
-                    "error": str(e)
-                })
+        # Score every answered case in one batch against a single fitted vocabulary
+        scored_positions = np.array([i for i, case in enumerate(cases) if "assistant_sql" in case], dtype=int)
+        passed = np.zeros(len(cases), dtype=bool)
+        if scored_positions.size:
+            scored = [cases[i] for i in scored_positions]
+            similarities = self.score_similarities(
+                [case["assistant_sql"] for case in scored],
+                [case["ground_truth_sql"] for case in scored],
+                ground_truth_corpus,
+            )
+            for case, similarity in zip(scored, similarities.tolist()):
+                case["similarity"] = similarity
 
-        results["execution_time"] = time.time() - start_time
-        
-        if results["similarities"]:
-            similarities = [s["similarity"] for s in results["similarities"]]
-            results["average_similarity"] = np.mean(similarities)
-            results["median_similarity"] = np.median(similarities)
-            results["min_similarity"] = np.min(similarities)
-            results["max_similarity"] = np.max(similarities)
+            if scoring == "execution":
+                passed[scored_positions] = [case.get("execution_match", False) for case in scored]
+            else:
+                passed[scored_positions] = similarities >= config.evaluation_config.get('similarity_threshold', 0.8)
+
+            results["similarities"] = scored
+            results["average_similarity"] = float(similarities.mean())
+            results["median_similarity"] = float(np.median(similarities))
+            results["min_similarity"] = float(similarities.min())
+            results["max_similarity"] = float(similarities.max())
+
+        results["successful_queries"] = int(passed.sum())
+        results["failed_queries"] = len(cases) - results["successful_queries"]
+        results["failed_cases"] = [case for case, ok in zip(cases, passed) if not ok]
+        if scored_positions.size:
             results["success_rate"] = (results["successful_queries"] / results["total_queries"]) * 100
 
+        if matcher is not None:
+            results["scoring"] = scoring
+            matches = np.array([case.get("execution_match", False) for case in cases], dtype=bool)
+            results["execution_accuracy"] = float(matches.mean() * 100) if matches.size else 0.0
+
+        results["execution_time"] = time.time() - start_time
+        if isinstance(assistant.llm_with_tools, RecordReplayLLM):
+            results["llm_replay"] = dict(
+                replay_stats.as_dict(),
+                mode=assistant.llm_with_tools.mode,
+                stored_responses=assistant.llm_with_tools.store.count(),
+            )
+
+        # Cases answered in this run only: a reused case carries the latency of
+        # the run that stored it, measured under that run's load
+        latencies = np.array([case["latency"] for case in cases if "latency" in case and not case.get("reused")])
+        if latencies.size:
+            results["average_latency"] = float(latencies.mean())
+            results["p95_latency"] = float(np.percentile(latencies, 95))
+
         return results
+
+    async def _evaluate_case(self, assistant, idx: int, question: str, ground_truth_sql: str,
+                             thread_id: str, semaphore: asyncio.Semaphore,
+                             matcher: Optional[ExecutionMatcher] = None,
+                             key_parts: Optional[Dict[str, Any]] = None, force: bool = False) -> Dict[str, Any]:
+        """Ask one ground-truth question in an isolated thread and score the answer"""
+        try:
+            # pandas reads empty cells as NaN
+            question = "" if pd.isna(question) else str(question)
+            ground_truth_sql = "" if pd.isna(ground_truth_sql) else str(ground_truth_sql).strip()
+            if not (question.strip() and ground_truth_sql):
+                return {"query_id": idx + 1, "query": question, "error": "Missing question or ground-truth SQL"}
+            return await self._answer_case(assistant, idx, question, ground_truth_sql, thread_id, semaphore,
+                                           matcher, key_parts, force)
+        except Exception as e:
+            # One bad row fails its own case, not the whole evaluation
+            return {"query_id": idx + 1, "query": question, "error": str(e)}
+
+    async def _answer_case(self, assistant, idx: int, question: str, ground_truth_sql: str,
+                           thread_id: str, semaphore: asyncio.Semaphore,
+                           matcher: Optional[ExecutionMatcher],
+                           key_parts: Optional[Dict[str, Any]], force: bool) -> Dict[str, Any]:
+        stored = None
+        if self.store is not None and key_parts is not None:
+            case_key = self.store.make_key(question, **key_parts)
+            if not force:
+                stored = await asyncio.to_thread(self.store.get, case_key)
+
+        if stored is not None:
+            assistant_result, latency = stored["response"], stored["latency"]
+        else:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    assistant_result = await assistant.process_query(question, thread_id)
+                except Exception as e:
+                    return {
+                        "query_id": idx + 1,
+                        "query": question,
+                        "error": str(e),
+                        "latency": time.perf_counter() - started
+                    }
+                latency = time.perf_counter() - started
+            if self.store is not None and key_parts is not None:
+                await asyncio.to_thread(self.store.put, case_key, question, assistant_result, latency, key_parts)
+
+        assistant_sql = self.extract_sql_from_response(assistant_result)
+        raw_ground_truth_sql = ground_truth_sql
+        ground_truth_sql = raw_ground_truth_sql.lower()
+
+        if not (assistant_sql and ground_truth_sql):
+            return {
+                "query_id": idx + 1,
+                "query": question,
+                "error": "No SQL query found in response",
+                "latency": latency,
+                "reused": stored is not None
+            }
+
+        # Similarity is scored for all cases at once in evaluate_assistant
+        case_data = {
+            "query_id": idx + 1,
+            "query": question,
+            "assistant_sql": assistant_sql,
+            "ground_truth_sql": ground_truth_sql,
+            "latency": latency,
+            "reused": stored is not None
+        }
+
+        if matcher is not None:
+            # Execution needs the original casing: string literals are case-sensitive
+            executed_sql = self.extract_sql_from_response(assistant_result, preserve_case=True)
+            try:
+                match, execution = await matcher.compare(executed_sql, raw_ground_truth_sql)
+                case_data["execution_match"] = match
+                case_data["execution"] = execution
+            except Exception as e:
+                case_data["execution_match"] = False
+                case_data["execution"] = {"error": str(e)}
+
+        return case_data
@@ -0,0 +1,180 @@
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBERS = re.compile(r"\d+(?:\.\d+)?")
+
+# Rows shown when an answer is rebuilt from refreshed results
+_MAX_RENDERED_ROWS = 20
+
+
+def normalize_question(question: str) -> str:
+    """Case and whitespace folded, trailing punctuation dropped; operators and numbers kept"""
+    return _WHITESPACE.sub(" ", question.strip().lower()).rstrip("?!. ")
+
+
+def render_refreshed_answer(sql: str, result: Dict[str, Any]) -> str:
+    """Answer for a cached question whose SQL now returns different data"""
+    columns = result.get("columns") or []
+    rows = result.get("results") or []
+    lines = ["Answer (refreshed from the live database):", ""]
+    if isinstance(rows, list) and columns:
+        lines.append("| " + " | ".join(columns) + " |")
+        lines.append("|" + "---|" * len(columns))
+        for row in rows[:_MAX_RENDERED_ROWS]:
+            values = [row.get(column) for column in columns] if isinstance(row, dict) else list(row)
+            lines.append("| " + " | ".join("" if value is None else str(value) for value in values) + " |")
+        if len(rows) > _MAX_RENDERED_ROWS or result.get("row_count", 0) < (result.get("total_count") or 0):
+            lines.append("")
+            lines.append(result.get("message", ""))
+    else:
+        lines.append(str(rows))
+    lines.extend(["", "Used SQL:", "```sql", sql, "```"])
+    return "\n".join(lines)
+
+
+class AnswerCache:
+    '''LRU cache of assistant answers to natural-language questions.
+
+    Entries are scoped by everything that can change an answer besides the
+    data (database path, schema version, system prompt hash, model) and keep
+    the SQL the answer was based on together with its result, so a hit only
+    needs that SQL re-run to check the numbers are still current. Optional
+    near-duplicate matching compares questions of the same scope by TF-IDF
+    cosine similarity; the numbers in both questions must be identical.
+    '''
+
+    def __init__(self, max_entries: int = 512, near_duplicate_threshold: Optional[float] = None):
+        self.max_entries = max_entries
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # scope -> (keys, vectorizer, matrix), rebuilt after the scope changes
+        self._indexes: Dict[Tuple, Tuple[List[Tuple], Any, Any]] = {}
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.invalidations = 0
+
+    def _near_duplicate(self, question: str, scope: Tuple) -> Optional[Tuple]:
+        index = self._indexes.get(scope)
+        if index is None:
+            keys = [key for key in self._entries if key[1:] == scope]
+            if not keys:
+                return None
+            from sklearn.feature_extraction.text import TfidfVectorizer
+
+            vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True)
+            try:
+                matrix = vectorizer.fit_transform([key[0] for key in keys])
+            except ValueError:
+                # Nothing but stop words / empty vocabulary
+                return None
+            index = (keys, vectorizer, matrix)
+            self._indexes[scope] = index
+        keys, vectorizer, matrix = index
+        scores = (matrix @ vectorizer.transform([question]).T).toarray().ravel()
+        best = int(scores.argmax())
+        if scores[best] < self.near_duplicate_threshold:
+            return None
+        # "sales in 2023" and "sales in 2024" are textually close but different questions
+        if _NUMBERS.findall(keys[best][0]) != _NUMBERS.findall(question):
+            return None
+        return keys[best]
+
+    def get(self, question: str, scope: Tuple) -> Tuple[Optional[Tuple], Optional[Dict[str, Any]]]:
+        """Return (key, entry) of the cached answer for question, or (None, None)"""
+        normalized = normalize_question(question)
+        with self._lock:
+            key = (normalized,) + scope
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.exact_hits += 1
+            elif self.near_duplicate_threshold:
+                key = self._near_duplicate(normalized, scope)
+                entry = self._entries.get(key) if key else None
+                if entry is not None:
+                    self.near_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            entry["hits"] += 1
+            return key, dict(entry)
+
+    def put(self, question: str, scope: Tuple, answer: str, sql: str, results: Any, max_results: Optional[int] = None):
+        key = (normalize_question(question),) + scope
+        with self._lock:
+            self._entries[key] = {
+                "question": question, "answer": answer, "sql": sql, "max_results": max_results,
+                "results": results, "created_at": time.time(), "hits": 0,
+            }
+            self._entries.move_to_end(key)
+            self._indexes.pop(scope, None)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._indexes.pop(evicted[1:], None)
+                self.evictions += 1
+
+    def refresh(self, key: Tuple, answer: str, results: Any):
+        """Replace the answer of an entry whose SQL now returns different data"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.update(answer=answer, results=results)
+                self.refreshes += 1
+
+    def invalidate(self, key: Tuple):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._indexes.pop(key[1:], None)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._indexes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.exact_hits + self.near_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "exact_hits": self.exact_hits,
+                "near_duplicate_hits": self.near_hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+                "invalidations": self.invalidations,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+
+_cache_config = config.assistant_config.get('answer_cache', {})
+
+# Global answer cache instance
+answer_cache = AnswerCache(
+    max_entries=_cache_config.get('max_entries', 512),
+    near_duplicate_threshold=(
+        _cache_config.get('near_duplicate_threshold', 0.9)
+        if _cache_config.get('near_duplicate', False) else None
+    ),
+)
@@ -0,0 +1,498 @@
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+from logger import logger
+
+_COMPRESSED_SUFFIX = "+zlib"
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    '''LangGraph checkpointer backed by a local SQLite database in WAL mode.
+
+    Every gunicorn worker opens the same file, so a client that reconnects to
+    another worker finds its thread. Channel values are stored once per
+    channel version rather than once per checkpoint, values are serialized
+    with the graph's msgpack serializer and compressed with zlib above
+    compress_min_bytes, and each put / put_writes is a single transaction.
+    '''
+
+    def __init__(self, path: str, compress_min_bytes: int = 1024, busy_timeout_ms: int = 5000, serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.compress_min_bytes = compress_min_bytes
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=busy_timeout_ms / 1000)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL fsyncs only at WAL checkpoints: a crashed worker loses
+        # nothing, a power cut may lose the last few commits
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                type TEXT,
+                checkpoint BLOB,
+                metadata_type TEXT,
+                metadata BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                channel TEXT NOT NULL,
+                version TEXT NOT NULL,
+                type TEXT NOT NULL,
+                blob BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+            );
+            CREATE TABLE IF NOT EXISTS checkpoint_writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                type TEXT,
+                value BLOB,
+                task_path TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+        """)
+        self._conn.commit()
+
+    def _dumps(self, value: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        if len(data) >= self.compress_min_bytes:
+            return type_ + _COMPRESSED_SUFFIX, zlib.compress(data, 1)
+        return type_, data
+
+    def _loads(self, type_: str, data: bytes) -> Any:
+        if type_.endswith(_COMPRESSED_SUFFIX):
+            type_, data = type_[:-len(_COMPRESSED_SUFFIX)], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    def _load_channel_values(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        if not versions:
+            return {}
+        keys = [(channel, str(version)) for channel, version in versions.items()]
+        placeholders = ",".join("(?, ?)" for _ in keys)
+        rows = self._conn.execute(
+            f"SELECT channel, type, blob FROM checkpoint_blobs "
+            f"WHERE thread_id = ? AND checkpoint_ns = ? AND (channel, version) IN (VALUES {placeholders})",
+            [thread_id, checkpoint_ns] + [value for key in keys for value in key],
+        ).fetchall()
+        return {channel: self._loads(type_, blob) for channel, type_, blob in rows if type_ != "empty"}
+
+    def _pending_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[Tuple[str, str, Any]]:
+        rows = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM checkpoint_writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [(task_id, channel, self._loads(type_, value)) for task_id, channel, type_, value in rows]
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row: Tuple) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint = self._loads(type_, checkpoint_blob)
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_channel_values(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=self._loads(metadata_type, metadata_blob),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=self._pending_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._to_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        conditions, params = [], []
+        if config:
+            conditions.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                conditions.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                conditions.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            conditions.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                f"metadata_type, metadata FROM checkpoints {where} ORDER BY checkpoint_id DESC",
+                params,
+            ).fetchall()
+            results = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if filter:
+                    metadata = self._loads(row[4], row[5])
+                    if not all(metadata.get(key) == value for key, value in filter.items()):
+                        continue
+                if limit is not None and len(results) >= limit:
+                    break
+                results.append(self._to_tuple(thread_id, checkpoint_ns, tuple(row)))
+        yield from results
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        stored = checkpoint.copy()
+        values = stored.pop("channel_values")
+        blobs = [
+            (thread_id, checkpoint_ns, channel, str(version),
+             *(self._dumps(values[channel]) if channel in values else ("empty", None)))
+            for channel, version in new_versions.items()
+        ]
+        type_, checkpoint_blob = self._dumps(stored)
+        metadata_type, metadata_blob = self._dumps(get_checkpoint_metadata(config, metadata))
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO checkpoint_blobs VALUES (?, ?, ?, ?, ?, ?)", blobs)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, checkpoint_blob, metadata_type, metadata_blob),
+            )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config["configurable"]
+        key = (configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"])
+        rows = [
+            (*key, task_id, WRITES_IDX_MAP.get(channel, idx), channel, *self._dumps(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        # Regular writes are idempotent; special writes (errors, interrupts) replace
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        with self._lock, self._conn:
+            self._conn.executemany(f"{verb} INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock, self._conn:
+            for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def prune_thread(self, thread_id: str, keep_last: int) -> int:
+        """Delete all but the keep_last newest checkpoints of a thread, their writes and
+        the channel values only they referenced; return the number of checkpoints deleted"""
+        deleted = 0
+        with self._lock, self._conn:
+            namespaces = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id = ?", (thread_id,)
+            )]
+            for checkpoint_ns in namespaces:
+                oldest_kept = self._conn.execute(
+                    "SELECT checkpoint_id, type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+                    (thread_id, checkpoint_ns, keep_last - 1),
+                ).fetchone()
+                if oldest_kept is None:
+                    continue
+                params = (thread_id, checkpoint_ns, oldest_kept[0])
+                deleted += self._conn.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?", params
+                ).rowcount
+                self._conn.execute(
+                    "DELETE FROM checkpoint_writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?", params
+                )
+                # Channel versions only grow, so values older than the ones the
+                # oldest kept checkpoint points at are unreachable
+                versions = self._loads(oldest_kept[1], oldest_kept[2])["channel_versions"]
+                self._conn.executemany(
+                    "DELETE FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version < ?",
+                    [(thread_id, checkpoint_ns, channel, str(version)) for channel, version in versions.items()],
+                )
+        return deleted
+
+    def thread_usage(self, thread_id: str) -> Dict[str, int]:
+        """Number of checkpoints and serialized bytes stored for a thread"""
+        with self._lock:
+            checkpoints, checkpoint_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) "
+                "FROM checkpoints WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+            blob_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(blob)), 0) FROM checkpoint_blobs WHERE thread_id = ?", (thread_id,)
+            ).fetchone()[0]
+            write_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM checkpoint_writes WHERE thread_id = ?", (thread_id,)
+            ).fetchone()[0]
+        return {"checkpoints": checkpoints, "bytes": checkpoint_bytes + blob_bytes + write_bytes}
+
+    async def aprune_thread(self, thread_id: str, keep_last: int) -> int:
+        return await asyncio.to_thread(self.prune_thread, thread_id, keep_last)
+
+    async def athread_usage(self, thread_id: str) -> Dict[str, int]:
+        return await asyncio.to_thread(self.thread_usage, thread_id)
+
+    # SQLite calls block, so the async API runs them off the event loop
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        results = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for result in results:
+            yield result
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None = None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        # Zero-padded so versions compare correctly as strings
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+class BoundedMemorySaver(InMemorySaver):
+    '''In-process MemorySaver that can prune old checkpoints and report the
+    size of a thread, so the session manager can keep it bounded.
+
+    Blobs and writes are keyed by tuples that start with the thread ID, so
+    both operations scan those dicts once.
+    '''
+
+    def prune_thread(self, thread_id: str, keep_last: int) -> int:
+        deleted = 0
+        for checkpoint_ns, checkpoints in self.storage.get(thread_id, {}).items():
+            if len(checkpoints) <= keep_last:
+                continue
+            checkpoint_ids = sorted(checkpoints)
+            stale, oldest_kept = checkpoint_ids[:-keep_last], checkpoint_ids[-keep_last]
+            for checkpoint_id in stale:
+                del checkpoints[checkpoint_id]
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            versions = self.serde.loads_typed(checkpoints[oldest_kept][0])["channel_versions"]
+            unreachable = [
+                key for key in self.blobs
+                if key[0] == thread_id and key[1] == checkpoint_ns
+                and key[2] in versions and key[3] < versions[key[2]]
+            ]
+            for key in unreachable:
+                del self.blobs[key]
+            deleted += len(stale)
+        return deleted
+
+    def thread_usage(self, thread_id: str) -> Dict[str, int]:
+        namespaces = self.storage.get(thread_id, {})
+        size = sum(
+            len(checkpoint[1]) + len(metadata[1])
+            for checkpoints in namespaces.values()
+            for checkpoint, metadata, _ in checkpoints.values()
+        )
+        size += sum(len(value[1]) for key, value in self.blobs.items() if key[0] == thread_id)
+        size += sum(
+            len(write[2][1])
+            for key, writes in self.writes.items() if key[0] == thread_id
+            for write in writes.values()
+        )
+        return {"checkpoints": sum(len(checkpoints) for checkpoints in namespaces.values()), "bytes": size}
+
+    # Same thread as the graph: the dicts are only touched from the event loop
+
+    async def aprune_thread(self, thread_id: str, keep_last: int) -> int:
+        return self.prune_thread(thread_id, keep_last)
+
+    async def athread_usage(self, thread_id: str) -> Dict[str, int]:
+        return self.thread_usage(thread_id)
+
+
+def _create_postgres_checkpointer(postgres_config: Dict[str, Any]):
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+
+    conn_string = os.getenv(postgres_config.get('conn_string_env', 'CHECKPOINT_POSTGRES_URL'))
+    if not conn_string:
+        raise ValueError("checkpointer.postgres: connection string environment variable is not set")
+    # Opened (and the tables created) by open_checkpointer
+    pool = AsyncConnectionPool(
+        conn_string,
+        max_size=postgres_config.get('pool_size', 10),
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        open=False,
+    )
+    return AsyncPostgresSaver(pool)
+
+
+def create_checkpointer(checkpointer_config: Optional[Dict[str, Any]] = None):
+    """Build the checkpointer selected by the checkpointer.backend setting"""
+    checkpointer_config = checkpointer_config if checkpointer_config is not None else config.checkpointer_config
+    backend = checkpointer_config.get('backend', 'memory')
+    if backend == 'sqlite':
+        sqlite_config = checkpointer_config.get('sqlite', {})
+        path = str(project_root / sqlite_config.get('path', 'cache/checkpoints.db'))
+        logger.info("Using SQLite checkpointer at %s", path)
+        return SQLiteCheckpointSaver(
+            path,
+            compress_min_bytes=sqlite_config.get('compress_min_bytes', 1024),
+            busy_timeout_ms=sqlite_config.get('busy_timeout_ms', 5000),
+        )
+    if backend == 'postgres':
+        logger.info("Using Postgres checkpointer")
+        return _create_postgres_checkpointer(checkpointer_config.get('postgres', {}))
+    if backend == 'memory':
+        return BoundedMemorySaver()
+    raise ValueError(f"Unknown checkpointer backend: {backend}")
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """Return the process-wide checkpointer shared by all assistants.
+
+    AsyncPostgresSaver needs a running event loop, so with the postgres
+    backend this is None until open_checkpointer() has run on startup.
+    """
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer is None and config.checkpointer_config.get('backend', 'memory') != 'postgres':
+            _checkpointer = create_checkpointer()
+        return _checkpointer
+
+
+async def open_checkpointer():
+    """Create the Postgres checkpointer on the running loop, open its pool and create its tables; the others are returned as is"""
+    global _checkpointer
+    checkpointer = get_checkpointer()
+    if checkpointer is None:
+        checkpointer = create_checkpointer()
+        await checkpointer.conn.open()
+        await checkpointer.setup()
+        with _checkpointer_lock:
+            _checkpointer = checkpointer
+    return checkpointer
+
+
+async def close_checkpointer():
+    """Close the connection pool of a Postgres checkpointer"""
+    if config.checkpointer_config.get('backend') == 'postgres' and _checkpointer is not None:
+        await _checkpointer.conn.close()
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class EvaluationStore:
+    '''Persistent store of assistant answers to ground-truth questions.
+
+    Each answer is keyed by everything that can change it: the question text,
+    model name, temperature, a hash of the system prompt and the database
+    schema version. Re-running an evaluation only asks the LLM about cases
+    whose key is not stored yet.
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS evaluation_responses (
+                case_key TEXT PRIMARY KEY,
+                question TEXT NOT NULL,
+                response TEXT NOT NULL,
+                latency REAL,
+                metadata TEXT,
+                created_at REAL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(question: str, model: str, temperature: float, system_prompt_hash: str, schema_version: str) -> str:
+        payload = json.dumps(
+            [question.strip(), model, temperature, system_prompt_hash, schema_version],
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, case_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, latency, created_at FROM evaluation_responses WHERE case_key = ?",
+                (case_key,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"response": row[0], "latency": row[1], "created_at": row[2]}
+
+    def put(self, case_key: str, question: str, response: str, latency: float, metadata: Optional[Dict] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO evaluation_responses VALUES (?, ?, ?, ?, ?, ?)",
+                (case_key, question, response, latency, json.dumps(metadata or {}), time.time()),
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM evaluation_responses").fetchone()[0]
+
+
+_stores: Dict[str, EvaluationStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_evaluation_store(path: str) -> EvaluationStore:
+    """One store (and SQLite connection) per path for the whole process, shared by all evaluation requests"""
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = EvaluationStore(path)
+        return store
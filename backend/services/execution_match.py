@@ -0,0 +1,263 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+from tools.query_budget import QueryBudget
+from tools.result_cache import normalize_sql
+
+_MASK = (1 << 128) - 1
+
+
+def _normalize_value(value: Any) -> str:
+    if value is None:
+        return "\x00"
+    if isinstance(value, float):
+        # 1.0 from SUM() and 1 from COUNT() describe the same answer
+        return repr(round(value, 6)) if not value.is_integer() else str(int(value))
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=16).digest(), "big")
+
+
+def _hash_rows(cursor: sqlite3.Cursor, chunk_size: int, order=None, column_sums=None) -> Tuple[int, int]:
+    """Multiset hash and count of the remaining rows, with columns taken in order;
+    with column_sums, also add each column's multiset hash to it"""
+    accumulator = 0
+    row_count = 0
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for row in rows:
+            values = [_normalize_value(value) for value in row]
+            if column_sums is not None:
+                for position, value in enumerate(values):
+                    column_sums[position] = (column_sums[position] + _digest(value)) & _MASK
+            if order is not None:
+                values = [values[position] for position in order]
+            accumulator = (accumulator + _digest("\x1f".join(values))) & _MASK
+        row_count += len(rows)
+    return accumulator, row_count
+
+
+def fingerprint_query(db_path: str, sql: str, timeout_ms: Optional[float] = None,
+                      max_vm_steps: Optional[int] = None, chunk_size: int = 1000,
+                      ignore_column_order: bool = True) -> Dict[str, Any]:
+    '''
+    Execute sql and reduce its result to an order-insensitive fingerprint.
+
+    Each row is hashed (blake2b, 128 bits) and the row hashes are summed
+    modulo 2**128, which is a multiset hash: it does not depend on row order
+    and can be computed while streaming, so only chunk_size rows are held
+    in memory. Runs inside a worker process under a QueryBudget.
+
+    With ignore_column_order, the columns of every row are put in one
+    canonical order: by the multiset hash of each column's values, ties in
+    select-list order. The first pass computes those column hashes; when
+    they are not already in canonical order, a second pass re-hashes the
+    rows with the columns permuted.
+    '''
+    started = time.monotonic()
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    budget = QueryBudget(timeout_ms=timeout_ms, max_vm_steps=max_vm_steps)
+    try:
+        with budget.attach(conn):
+            cursor = conn.execute(sql)
+            column_count = len(cursor.description) if cursor.description else 0
+            column_sums = [0] * column_count if ignore_column_order else None
+            accumulator, row_count = _hash_rows(cursor, chunk_size, column_sums=column_sums)
+            if ignore_column_order:
+                order = sorted(range(column_count), key=lambda position: (column_sums[position], position))
+                if order != list(range(column_count)):
+                    accumulator, _ = _hash_rows(conn.execute(sql), chunk_size, order=order)
+        return {
+            "row_count": row_count,
+            "column_count": column_count,
+            "fingerprint": f"{accumulator:032x}",
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+    except sqlite3.Error as e:
+        result = {"error": str(e), "elapsed_ms": round((time.monotonic() - started) * 1000, 1)}
+        if budget.exceeded:
+            result["error"] = f"Query aborted after {budget.elapsed_ms:.0f} ms ({budget.exceeded})"
+            result["aborted"] = True
+        return result
+    finally:
+        conn.close()
+
+
+def database_version(db_path: str) -> str:
+    """Version of the database contents that is stable across processes and runs.
+
+    Readers in WAL mode recreate the -wal file, so its mtime changes with every
+    process; only its header (checkpoint sequence and salts, which change when
+    the log restarts) and its size, which grows with every commit, are used.
+    PRAGMA data_version cannot help here: it only compares within one connection.
+    """
+    stat = os.stat(db_path)
+    try:
+        with open(f"{db_path}-wal", "rb") as wal:
+            header = wal.read(32)
+            wal_signature = f"{header[12:24].hex()}:{os.fstat(wal.fileno()).st_size}" if header else "-"
+    except OSError:
+        wal_signature = "-"
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    finally:
+        conn.close()
+    return f"{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_size}:{wal_signature}:{schema_version}"
+
+
+class GroundTruthResultCache:
+    '''Persistent fingerprints of ground-truth query results.
+
+    Keyed by the normalized SQL and the database version, so an expensive
+    ground-truth query runs once per database version rather than once per
+    evaluation run.
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ground_truth_results (
+                sql_hash TEXT NOT NULL,
+                db_version TEXT NOT NULL,
+                row_count INTEGER,
+                column_count INTEGER,
+                fingerprint TEXT,
+                created_at REAL,
+                PRIMARY KEY (sql_hash, db_version)
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _sql_hash(sql: str) -> str:
+        return hashlib.sha256(normalize_sql(sql).encode()).hexdigest()
+
+    def get(self, sql: str, db_version: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT row_count, column_count, fingerprint FROM ground_truth_results "
+                "WHERE sql_hash = ? AND db_version = ?",
+                (self._sql_hash(sql), db_version),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"row_count": row[0], "column_count": row[1], "fingerprint": row[2], "cached": True}
+
+    def put(self, sql: str, db_version: str, result: Dict[str, Any]):
+        if "error" in result:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ground_truth_results VALUES (?, ?, ?, ?, ?, ?)",
+                (self._sql_hash(sql), db_version, result["row_count"], result["column_count"],
+                 result["fingerprint"], time.time()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ExecutionMatcher:
+    '''Scores generated SQL by comparing its result set with the ground truth's.
+
+    Both queries run in a process pool, so heavy queries neither hold the GIL
+    nor block the event loop. Each query runs under the configured time and
+    VM-step budget.
+    '''
+
+    _executor: Optional[ProcessPoolExecutor] = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, db_path: Optional[str] = None, match_config: Optional[Dict] = None):
+        self.match_config = match_config if match_config is not None else config.evaluation_config.get('execution_match', {})
+        self.db_path = os.path.abspath(db_path or config.database_config.get('default_path', 'database.db'))
+        cache_path = self.match_config.get('cache_path')
+        self.cache = GroundTruthResultCache(str(project_root / cache_path)) if cache_path else None
+
+    def close(self):
+        """Close the ground-truth cache connection; the process pool is shared and stays up"""
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    def __enter__(self) -> 'ExecutionMatcher':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @classmethod
+    def _get_executor(cls, max_workers: int) -> ProcessPoolExecutor:
+        with cls._executor_lock:
+            if cls._executor is None:
+                # spawn: forking a process that runs an event loop and threads is unsafe
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return cls._executor
+
+    async def _fingerprint(self, sql: str) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor(self.match_config.get('workers', 2))
+        return await loop.run_in_executor(
+            executor,
+            fingerprint_query,
+            self.db_path,
+            sql,
+            self.match_config.get('timeout_ms', 10000),
+            self.match_config.get('max_vm_steps'),
+            self.match_config.get('chunk_size', 1000),
+            self.match_config.get('ignore_column_order', True),
+        )
+
+    async def _ground_truth_fingerprint(self, sql: str, db_version: str) -> Dict[str, Any]:
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, sql, db_version)
+            if cached is not None:
+                return cached
+        result = await self._fingerprint(sql)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, sql, db_version, result)
+        return result
+
+    async def compare(self, generated_sql: str, ground_truth_sql: str) -> Tuple[bool, Dict[str, Any]]:
+        """Return (results match, details for the report)"""
+        db_version = await asyncio.to_thread(database_version, self.db_path)
+        generated, expected = await asyncio.gather(
+            self._fingerprint(generated_sql),
+            self._ground_truth_fingerprint(ground_truth_sql, db_version),
+        )
+        match = (
+            "error" not in generated
+            and "error" not in expected
+            and generated["row_count"] == expected["row_count"]
+            and generated["fingerprint"] == expected["fingerprint"]
+        )
+        return match, {"generated": generated, "ground_truth": expected}
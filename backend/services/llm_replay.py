@@ -0,0 +1,207 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, messages_from_dict, messages_to_dict
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+from logger import logger
+
+
+class ReplayStats:
+    """Hit/miss counters and the live LLM time the hits avoided"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self.saved_latency = 0.0
+        self.live_latency = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "recorded": self.recorded,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_latency": round(self.saved_latency, 3),
+            "live_latency": round(self.live_latency, 3),
+        }
+
+
+# Stats of the evaluation run (or other scope) the current task belongs to
+_run_stats: contextvars.ContextVar[Optional[ReplayStats]] = contextvars.ContextVar('llm_replay_run_stats', default=None)
+
+
+@contextmanager
+def replay_run_stats() -> Iterator[ReplayStats]:
+    """Count the replay hits and misses of the LLM calls made inside the block, including its tasks"""
+    stats = ReplayStats()
+    token = _run_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _run_stats.reset(token)
+
+
+def _message_key(message: BaseMessage) -> Dict[str, Any]:
+    # Ids are random per run and carry no meaning for the model
+    entry = {"type": message.type, "content": message.content}
+    if isinstance(message, AIMessage) and message.tool_calls:
+        entry["tool_calls"] = [{"name": call["name"], "args": call["args"]} for call in message.tool_calls]
+    if getattr(message, "name", None):
+        entry["name"] = message.name
+    return entry
+
+
+class LLMReplayStore:
+    '''Recorded LLM responses keyed by a hash of the request.
+
+    Every response is written to a local SQLite file and kept in a dict, so
+    replayed calls are served from memory; the file only matters on startup.
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                request_key TEXT PRIMARY KEY,
+                request TEXT NOT NULL,
+                response TEXT NOT NULL,
+                latency REAL,
+                created_at REAL
+            )
+        """)
+        self._conn.commit()
+        self._entries: Dict[str, Dict[str, Any]] = {
+            key: {"response": response, "latency": latency}
+            for key, response, latency in self._conn.execute("SELECT request_key, response, latency FROM llm_responses")
+        }
+
+    def get(self, request_key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(request_key)
+
+    def put(self, request_key: str, request: str, response: str, latency: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?)",
+                (request_key, request, response, latency, time.time()),
+            )
+            self._conn.commit()
+            self._entries[request_key] = {"response": response, "latency": latency}
+
+    def count(self) -> int:
+        return len(self._entries)
+
+
+class RecordReplayLLM(Runnable):
+    '''Record/replay wrapper around a tool-bound chat model.
+
+    Requests are keyed by a hash of the model settings, the tool specs and
+    the messages (without their ids). In "record" mode every call goes to
+    the live model and its response is stored; in "replay" mode a stored
+    response is returned without calling the model, and only misses go live
+    (and are recorded). Replayed calls emit no streaming events.
+    '''
+
+    def __init__(self, llm: Runnable, tools: Sequence, store: LLMReplayStore, mode: str = "replay"):
+        self.llm = llm
+        self.store = store
+        self.mode = mode
+        self.stats = ReplayStats()
+        llm_config = config.llm_config
+        self._request_prefix = {
+            "model": llm_config.get('model'),
+            "temperature": llm_config.get('temperature'),
+            "max_tokens": llm_config.get('max_tokens'),
+            "tools": [convert_to_openai_tool(tool) for tool in tools],
+        }
+
+    def _request(self, messages: List[BaseMessage]) -> str:
+        return json.dumps(
+            dict(self._request_prefix, messages=[_message_key(message) for message in messages]),
+            sort_keys=True, separators=(",", ":"), default=str,
+        )
+
+    def _replayed(self, request_key: str) -> Optional[AIMessage]:
+        entry = self.store.get(request_key) if self.mode == "replay" else None
+        if entry is None:
+            return None
+        message = messages_from_dict([json.loads(entry["response"])])[0]
+        # A fresh id, so the graph appends rather than replaces
+        message.id = None
+        self._count(hits=1, saved_latency=entry["latency"] or 0.0)
+        return message
+
+    def _count(self, **deltas):
+        run_stats = _run_stats.get()
+        for stats in (self.stats, run_stats) if run_stats is not None else (self.stats,):
+            for name, delta in deltas.items():
+                setattr(stats, name, getattr(stats, name) + delta)
+
+    def invoke(self, input, config: Optional[RunnableConfig] = None, **kwargs) -> AIMessage:
+        request = self._request(input)
+        request_key = hashlib.sha256(request.encode()).hexdigest()
+        message = self._replayed(request_key)
+        if message is not None:
+            return message
+        start = time.perf_counter()
+        message = self.llm.invoke(input, config, **kwargs)
+        latency = time.perf_counter() - start
+        self.store.put(request_key, request, json.dumps(messages_to_dict([message])[0]), latency)
+        self._count(misses=1, recorded=1, live_latency=latency)
+        return message
+
+    async def ainvoke(self, input, config: Optional[RunnableConfig] = None, **kwargs) -> AIMessage:
+        request = self._request(input)
+        request_key = hashlib.sha256(request.encode()).hexdigest()
+        message = self._replayed(request_key)
+        if message is not None:
+            return message
+        start = time.perf_counter()
+        message = await self.llm.ainvoke(input, config, **kwargs)
+        latency = time.perf_counter() - start
+        # SQLite write off the event loop
+        await asyncio.to_thread(self.store.put, request_key, request, json.dumps(messages_to_dict([message])[0]), latency)
+        self._count(misses=1, recorded=1, live_latency=latency)
+        return message
+
+
+_stores: Dict[str, LLMReplayStore] = {}
+_stores_lock = threading.Lock()
+
+
+def wrap_with_replay(llm_with_tools: Runnable, tools: Sequence, purpose: str) -> Runnable:
+    """Wrap the tool-bound model when llm.replay is on for this assistant purpose"""
+    replay_config = config.llm_config.get('replay', {})
+    mode = replay_config.get('mode', 'off')
+    # Unquoted off in YAML loads as False
+    if mode in ('off', False, None) or purpose not in replay_config.get('purposes', ['evaluator']):
+        return llm_with_tools
+    path = str(project_root / replay_config.get('path', 'cache/llm_replay.db'))
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = LLMReplayStore(path)
+    logger.info("LLM %s mode for the %s assistant: %d recorded responses in %s", mode, purpose, store.count(), path)
+    return RecordReplayLLM(llm_with_tools, tools, store, mode)
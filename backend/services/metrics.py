@@ -0,0 +1,236 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans a pooled SQLite lookup up to a slow LLM turn
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# (metric name, type, help, [(labels, value)]) produced at scrape time
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum", "_lock")
+
+    def __init__(self, upper_bounds: Sequence[float]):
+        self.upper_bounds = upper_bounds
+        # One slot per bucket plus +Inf; made cumulative only when rendered
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class _Metric(ABC):
+    '''A metric family: one child series per label value combination.
+
+    Callers on the hot path resolve their child once with labels() and keep
+    it; each update then takes only that series' own, uncontended lock.
+    '''
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self):
+        pass
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _unlabelled(self):
+        return self.labels()
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        return [
+            (self.name, dict(zip(self.labelnames, key)), child.value)
+            for key, child in list(self._children.items())
+        ]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._unlabelled().dec(amount)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.upper_bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        samples = []
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for upper_bound, count in zip(self.upper_bounds + (float("inf"),), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", dict(labels, le=_format_value(float(upper_bound))), cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    '''In-process metrics rendered in the Prometheus text exposition format.
+
+    Metrics updated on the request path are registered up front; values that
+    other components already count (cache statistics) are read by collector
+    callbacks only when /metrics is scraped.
+    '''
+
+    def __init__(self, namespace: str = "sqlmatic"):
+        self.namespace = namespace
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[Family]]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(f"{self.namespace}_{name}", help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(f"{self.namespace}_{name}", help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._register(Histogram(f"{self.namespace}_{name}", help, labelnames, buckets or DEFAULT_BUCKETS))
+
+    def register_collector(self, collector: Callable[[], List[Family]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for collector in self._collectors:
+            for name, metric_type, help, samples in collector():
+                name = f"{self.namespace}_{name}"
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry instance, served at /metrics
+metrics = MetricsRegistry()
+
+graph_node_duration = metrics.histogram(
+    "graph_node_duration_seconds", "Duration of LangGraph node executions", ["node"])
+tool_duration = metrics.histogram(
+    "tool_duration_seconds", "Duration of tool calls", ["tool"])
+tool_errors = metrics.counter(
+    "tool_errors_total", "Tool calls that raised or returned an error", ["tool"])
+llm_tokens = metrics.counter(
+    "llm_tokens_total", "LLM tokens reported by the model, by direction", ["direction"])
+sql_rows_scanned = metrics.counter(
+    "sql_rows_scanned_total", "Result rows SQLite produced for executed queries, before the result limit and up to the count cap")
+sql_rows_returned = metrics.counter(
+    "sql_rows_returned_total", "Result rows returned to the model by execute_sql_query")
+sql_vm_steps = metrics.counter(
+    "sql_vm_steps_total", "SQLite VM instructions counted by query budgets (check_interval granularity)")
+websocket_sessions = metrics.gauge(
+    "websocket_sessions_active", "Open /ws/chat connections")
+runs_cancelled = metrics.counter(
+    "runs_cancelled_total", "Assistant runs cancelled by a newer message, a cancel frame or a disconnect")
@@ -0,0 +1,209 @@
+import asyncio
+import sys
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+from logger import logger
+from services.checkpointer import get_checkpointer
+from services.thread_leases import create_thread_leases
+
+
+class SessionManager:
+    '''Keeps the conversation threads held by the checkpointer bounded.
+
+    Every run is tracked per thread: after it finishes, checkpoints beyond
+    max_checkpoints_per_thread are pruned and the thread's stored size is
+    recorded. Threads idle for longer than ttl_seconds, or the least recently
+    used ones once there are more than max_sessions, are deleted from the
+    checkpointer. Threads with a run in progress are never evicted.
+    '''
+
+    def __init__(self, checkpointer, session_config: Optional[Dict[str, Any]] = None):
+        session_config = session_config if session_config is not None else config.session_config
+        self.max_sessions = session_config.get('max_sessions', 1000)
+        self.ttl_seconds = session_config.get('ttl_seconds', 3600)
+        self.max_checkpoints_per_thread = session_config.get('max_checkpoints_per_thread', 20)
+        self.sweep_interval_seconds = session_config.get('sweep_interval_seconds', 60)
+        self.lease_ttl_seconds = session_config.get('lease_ttl_seconds', 30)
+        self.lease_poll_seconds = session_config.get('lease_poll_ms', 100) / 1000
+        self._thread_locks: "weakref.WeakValueDictionary[Any, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self.attach_checkpointer(checkpointer)
+        self._sessions: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self.evictions = 0
+        self.pruned_checkpoints = 0
+
+    def attach_checkpointer(self, checkpointer):
+        self.checkpointer = checkpointer
+        # Other workers may use a thread through a shared backend
+        self.shared_backend = not isinstance(checkpointer, InMemorySaver)
+        self.leases = create_thread_leases(checkpointer)
+
+    @asynccontextmanager
+    async def exclusive(self, thread_id):
+        """Let one run at a time use thread_id: an asyncio.Lock queues the runs of
+        this worker in order, a lease in the shared checkpointer database keeps
+        the other workers out. A run is cancelled and cleaned up before it exits
+        this block, so the next run never sees interleaved checkpoint writes.
+        """
+        lock = self._thread_locks.get(thread_id)
+        if lock is None:
+            lock = self._thread_locks[thread_id] = asyncio.Lock()
+        async with lock:
+            if self.leases is None:
+                yield
+                return
+            owner = uuid.uuid4().hex
+            acquire, renewal = None, None
+            try:
+                while True:
+                    acquire = asyncio.ensure_future(self.leases.aacquire(thread_id, owner, self.lease_ttl_seconds))
+                    if await asyncio.shield(acquire):
+                        break
+                    await asyncio.sleep(self.lease_poll_seconds)
+                renewal = asyncio.create_task(self._renew_lease(thread_id, owner))
+                yield
+            finally:
+                if renewal is not None:
+                    renewal.cancel()
+                # Cancelled while acquiring: the acquire may still commit, so release after it
+                if acquire is not None and not acquire.done():
+                    await asyncio.wait([acquire])
+                await asyncio.shield(self.leases.arelease(thread_id, owner))
+
+    async def _renew_lease(self, thread_id, owner: str):
+        while True:
+            await asyncio.sleep(self.lease_ttl_seconds / 3)
+            try:
+                await self.leases.arenew(thread_id, owner, self.lease_ttl_seconds)
+            except Exception as e:
+                logger.error("Could not renew the lease on thread %s: %s", thread_id, e)
+
+    @asynccontextmanager
+    async def track(self, thread_id):
+        """Wrap one run of the graph on thread_id"""
+        session = self._sessions.get(thread_id)
+        if session is None:
+            session = {"created_at": time.time(), "runs": 0, "active": 0, "checkpoints": None, "bytes": None}
+            self._sessions[thread_id] = session
+        self._sessions.move_to_end(thread_id)
+        session["last_access"] = time.time()
+        session["runs"] += 1
+        session["active"] += 1
+        try:
+            yield
+        finally:
+            session["active"] -= 1
+            session["last_access"] = time.time()
+            try:
+                await self._after_run(thread_id, session)
+            except Exception as e:
+                logger.error("Session bookkeeping failed for thread %s: %s", thread_id, e)
+
+    async def _after_run(self, thread_id, session: Dict[str, Any]):
+        if hasattr(self.checkpointer, 'aprune_thread'):
+            self.pruned_checkpoints += await self.checkpointer.aprune_thread(thread_id, self.max_checkpoints_per_thread)
+        if hasattr(self.checkpointer, 'athread_usage'):
+            session.update(await self.checkpointer.athread_usage(thread_id))
+        if len(self._sessions) > self.max_sessions:
+            await self.evict_idle()
+
+    async def _last_backend_activity(self, thread_id) -> Optional[float]:
+        checkpoint = await self.checkpointer.aget_tuple({"configurable": {"thread_id": thread_id}})
+        if checkpoint is None:
+            return None
+        return datetime.fromisoformat(checkpoint.checkpoint["ts"]).timestamp()
+
+    async def evict(self, thread_id) -> bool:
+        """Delete a thread from the checkpointer and stop tracking it"""
+        session = self._sessions.get(thread_id)
+        if session is not None and session["active"]:
+            return False
+        self._sessions.pop(thread_id, None)
+        await self.checkpointer.adelete_thread(thread_id)
+        self.evictions += 1
+        return True
+
+    async def evict_idle(self) -> int:
+        """Evict threads idle past the TTL, then least recently used ones above max_sessions"""
+        now = time.time()
+        overflow = len(self._sessions) - self.max_sessions
+        candidates = []
+        for thread_id, session in self._sessions.items():
+            if session["active"]:
+                continue
+            if now - session["last_access"] > self.ttl_seconds:
+                candidates.append(thread_id)
+            elif overflow > 0:
+                candidates.append(thread_id)
+                overflow -= 1
+
+        evicted = 0
+        for thread_id in candidates:
+            session = self._sessions.get(thread_id)
+            if session is None or session["active"]:
+                continue
+            if self.shared_backend and now - session["last_access"] > self.ttl_seconds:
+                # The client may have moved to another worker; keep threads it still uses
+                last_activity = await self._last_backend_activity(thread_id)
+                if last_activity is not None and now - last_activity <= self.ttl_seconds:
+                    session["last_access"] = last_activity
+                    self._sessions.move_to_end(thread_id)
+                    continue
+            if await self.evict(thread_id):
+                evicted += 1
+        if evicted:
+            logger.info("Evicted %d idle sessions, %d remain", evicted, len(self._sessions))
+        return evicted
+
+    async def run_sweeper(self):
+        """Evict idle sessions every sweep_interval_seconds until cancelled"""
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                logger.error("Session sweep failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        sessions = [
+            {
+                "thread_id": thread_id,
+                "runs": session["runs"],
+                "active": session["active"],
+                "idle_seconds": round(now - session["last_access"], 1),
+                "checkpoints": session["checkpoints"],
+                "bytes": session["bytes"],
+            }
+            for thread_id, session in self._sessions.items()
+        ]
+        sessions.sort(key=lambda session: session["bytes"] or 0, reverse=True)
+        return {
+            "backend": type(self.checkpointer).__name__,
+            "session_count": len(sessions),
+            "total_bytes": sum(session["bytes"] or 0 for session in sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "max_checkpoints_per_thread": self.max_checkpoints_per_thread,
+            "evictions": self.evictions,
+            "pruned_checkpoints": self.pruned_checkpoints,
+            "sessions": sessions,
+        }
+
+
+# Global session manager instance, shared by the assistants of this worker;
+# given the Postgres checkpointer on startup
+session_manager = SessionManager(get_checkpointer())
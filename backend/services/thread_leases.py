@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+from services.checkpointer import SQLiteCheckpointSaver
+
+# Taken when there is no row for the thread, the row is the caller's own
+# (renewal) or the previous holder let it expire (e.g. its worker died)
+_ACQUIRE_SQL = (
+    "INSERT INTO thread_leases (thread_id, owner, expires_at) VALUES ({p}, {p}, {p}) "
+    "ON CONFLICT (thread_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+    "WHERE thread_leases.owner = excluded.owner OR thread_leases.expires_at < {p}"
+)
+# Only extends a lease still held: a renewal racing a release must not revive it
+_RENEW_SQL = "UPDATE thread_leases SET expires_at = {p} WHERE thread_id = {p} AND owner = {p}"
+_RELEASE_SQL = "DELETE FROM thread_leases WHERE thread_id = {p} AND owner = {p}"
+_CREATE_SQL = """
+    CREATE TABLE IF NOT EXISTS thread_leases (
+        thread_id TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at DOUBLE PRECISION NOT NULL
+    )
+"""
+
+
+class SQLiteThreadLeases:
+    '''Expiring per-thread leases in the SQLite checkpoint database, so the
+    workers sharing that file run one graph run per thread at a time.
+    '''
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=busy_timeout_ms / 1000)
+        self._conn.execute(_CREATE_SQL)
+        self._conn.commit()
+
+    def acquire(self, thread_id: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(_ACQUIRE_SQL.format(p="?"), (thread_id, owner, now + ttl_seconds, now))
+        return cursor.rowcount == 1
+
+    def renew(self, thread_id: str, owner: str, ttl_seconds: float):
+        with self._lock, self._conn:
+            self._conn.execute(_RENEW_SQL.format(p="?"), (time.time() + ttl_seconds, thread_id, owner))
+
+    def release(self, thread_id: str, owner: str):
+        with self._lock, self._conn:
+            self._conn.execute(_RELEASE_SQL.format(p="?"), (thread_id, owner))
+
+    async def aacquire(self, thread_id: str, owner: str, ttl_seconds: float) -> bool:
+        return await asyncio.to_thread(self.acquire, thread_id, owner, ttl_seconds)
+
+    async def arenew(self, thread_id: str, owner: str, ttl_seconds: float):
+        await asyncio.to_thread(self.renew, thread_id, owner, ttl_seconds)
+
+    async def arelease(self, thread_id: str, owner: str):
+        await asyncio.to_thread(self.release, thread_id, owner)
+
+
+class PostgresThreadLeases:
+    """The same leases in the Postgres checkpoint database, through the checkpointer's pool"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._table_ready = False
+
+    async def _execute(self, sql: str, params=()):
+        async with self.pool.connection() as conn:
+            if not self._table_ready:
+                await conn.execute(_CREATE_SQL)
+                self._table_ready = True
+            return await conn.execute(sql, params)
+
+    async def aacquire(self, thread_id: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        cursor = await self._execute(_ACQUIRE_SQL.format(p="%s"), (thread_id, owner, now + ttl_seconds, now))
+        return cursor.rowcount == 1
+
+    async def arenew(self, thread_id: str, owner: str, ttl_seconds: float):
+        await self._execute(_RENEW_SQL.format(p="%s"), (time.time() + ttl_seconds, thread_id, owner))
+
+    async def arelease(self, thread_id: str, owner: str):
+        await self._execute(_RELEASE_SQL.format(p="%s"), (thread_id, owner))
+
+
+def create_thread_leases(checkpointer):
+    """Leases in the checkpointer's shared database; None for the per-worker memory backend"""
+    if isinstance(checkpointer, SQLiteCheckpointSaver):
+        sqlite_config = config.checkpointer_config.get('sqlite', {})
+        return SQLiteThreadLeases(checkpointer.path, sqlite_config.get('busy_timeout_ms', 5000))
+    if checkpointer is not None and config.checkpointer_config.get('backend') == 'postgres':
+        return PostgresThreadLeases(checkpointer.conn)
+    return None
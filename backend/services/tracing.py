@@ -0,0 +1,261 @@
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+from logger import logger
+
+
+class Span:
+    '''One timed operation of a request: a WebSocket message, an assistant
+    run, a graph step, an LLM call or a tool call. Spans of one request share
+    a trace_id and point at their parent; all carry the session id.
+    '''
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "session_id", "name", "start", "duration_ms",
+                 "status", "attributes", "_started")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], session_id: Optional[str],
+                 attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.session_id = session_id
+        self.name = name
+        self.start = time.time()
+        self.duration_ms: Optional[float] = None
+        self.status = "ok"
+        self.attributes = attributes
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self, max_attribute_chars: int) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "session_id": self.session_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": {key: _truncate(value, max_attribute_chars) for key, value in self.attributes.items()},
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _truncate(value: Any, max_chars: int) -> Any:
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return text if len(text) <= max_chars else f"{text[:max_chars]}... [{len(text) - max_chars} more]"
+
+
+class JSONLSpanSink:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+
+    def write(self, spans: List[Dict[str, Any]]):
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(span, default=str) + "\n" for span in spans)
+
+    def query(self, session_id: str) -> List[Dict[str, Any]]:
+        # Only the ring buffer is searched; the file is for offline analysis
+        return []
+
+
+class SQLiteSpanSink:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS spans (
+                span_id TEXT PRIMARY KEY,
+                trace_id TEXT NOT NULL,
+                parent_id TEXT,
+                session_id TEXT,
+                name TEXT NOT NULL,
+                start REAL NOT NULL,
+                duration_ms REAL,
+                status TEXT,
+                attributes TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_session ON spans(session_id, start)")
+        self._conn.commit()
+
+    def write(self, spans: List[Dict[str, Any]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (span["span_id"], span["trace_id"], span["parent_id"], span["session_id"], span["name"],
+                     span["start"], span["duration_ms"], span["status"], json.dumps(span["attributes"], default=str))
+                    for span in spans
+                ],
+            )
+            self._conn.commit()
+
+    def query(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT trace_id, span_id, parent_id, session_id, name, start, duration_ms, status, attributes "
+                "FROM spans WHERE session_id = ? ORDER BY start",
+                (session_id,),
+            ).fetchall()
+        return [
+            {
+                "trace_id": row[0], "span_id": row[1], "parent_id": row[2], "session_id": row[3], "name": row[4],
+                "start": row[5], "duration_ms": row[6], "status": row[7], "attributes": json.loads(row[8] or "{}"),
+            }
+            for row in rows
+        ]
+
+
+class Tracer:
+    '''Request-scoped spans kept in a bounded ring and exported in the background.
+
+    The current span lives in a contextvar, so graph nodes, ToolNode tasks and
+    tool threads (run_in_tool_executor copies the context) nest under the
+    request that started them. Finishing a span only appends it to the ring
+    and, with a sink configured, to a queue that a daemon thread drains in
+    batches into a JSONL file or SQLite table.
+    '''
+
+    def __init__(self, tracing_config: Optional[Dict[str, Any]] = None):
+        tracing_config = tracing_config if tracing_config is not None else config.tracing_config
+        self.enabled = tracing_config.get('enabled', True)
+        self.max_attribute_chars = tracing_config.get('max_attribute_chars', 2000)
+        self._ring: deque = deque(maxlen=tracing_config.get('ring_size', 10000))
+        self._current: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+        self.sink = None
+        sink = tracing_config.get('sink', 'none')
+        if sink == 'jsonl':
+            self.sink = JSONLSpanSink(str(project_root / tracing_config.get('path', 'cache/traces.jsonl')))
+        elif sink == 'sqlite':
+            self.sink = SQLiteSpanSink(str(project_root / tracing_config.get('path', 'cache/traces.db')))
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._exporter: Optional[threading.Thread] = None
+        self._exporter_lock = threading.Lock()
+        self.dropped = 0
+
+    def current(self) -> Optional[Span]:
+        return self._current.get()
+
+    @contextmanager
+    def span(self, name: str, session_id: Optional[str] = None, **attributes) -> Iterator[Span]:
+        """Time the block as a child of the current span, or as a new trace for session_id"""
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+        parent = self._current.get()
+        if parent is None:
+            span = Span(name, uuid.uuid4().hex, None, session_id, attributes)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, session_id or parent.session_id, attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "cancelled" if isinstance(e, (asyncio.CancelledError, GeneratorExit)) else "error"
+            span.attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - span._started) * 1000
+            try:
+                self._current.reset(token)
+            except ValueError:
+                # Async generators may be finalized from another context
+                self._current.set(parent)
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        self._ring.append(span)
+        if self.sink is not None:
+            if self._exporter is None:
+                self._start_exporter()
+            self._queue.put(span)
+
+    def _start_exporter(self):
+        with self._exporter_lock:
+            if self._exporter is None:
+                self._exporter = threading.Thread(target=self._export_loop, name="span_exporter", daemon=True)
+                self._exporter.start()
+
+    def _export_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            spans = [span.to_dict(self.max_attribute_chars) for span in batch if span is not None]
+            try:
+                if spans:
+                    self.sink.write(spans)
+            except Exception as e:
+                self.dropped += len(spans)
+                logger.error("Exporting %d spans failed: %s", len(spans), e)
+            if stop:
+                return
+
+    def close(self, timeout: float = 5.0):
+        """Flush queued spans to the sink"""
+        if self._exporter is not None:
+            self._queue.put(None)
+            self._exporter.join(timeout)
+            self._exporter = None
+
+    def traces(self, session_id: str) -> List[Dict[str, Any]]:
+        """Traces of a session, oldest first, each with its spans in start order"""
+        spans = {
+            span["span_id"]: span
+            for span in (self.sink.query(session_id) if self.sink is not None else [])
+        }
+        for span in list(self._ring):
+            if span.session_id == session_id:
+                spans[span.span_id] = span.to_dict(self.max_attribute_chars)
+
+        traces: Dict[str, Dict[str, Any]] = {}
+        for span in sorted(spans.values(), key=lambda span: span["start"]):
+            trace = traces.setdefault(span["trace_id"], {"trace_id": span["trace_id"], "start": span["start"], "spans": []})
+            span["offset_ms"] = round((span["start"] - trace["start"]) * 1000, 3)
+            trace["spans"].append(span)
+        for trace in traces.values():
+            root = next((span for span in trace["spans"] if span["parent_id"] is None), trace["spans"][0])
+            trace["name"] = root["name"]
+            trace["duration_ms"] = root["duration_ms"]
+        return list(traces.values())
+
+
+# Global tracer instance
+tracer = Tracer()
@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# The offline model needs no API key; set before config is first imported
+os.environ.setdefault("LLM_MODEL", "fake")
+
+# Add the backend directory to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
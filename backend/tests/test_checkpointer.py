@@ -0,0 +1,142 @@
+import asyncio
+import uuid
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+
+from services.checkpointer import SQLiteCheckpointSaver
+
+
+def thread_config(thread_id="thread-1", checkpoint_id=None):
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def next_checkpoint(saver, previous, values):
+    """Checkpoint after previous with values written to their channels, and the versions put() needs"""
+    checkpoint = empty_checkpoint()
+    if previous is not None:
+        checkpoint["channel_versions"] = dict(previous["channel_versions"])
+    new_versions = {}
+    for channel in values:
+        version = saver.get_next_version(checkpoint["channel_versions"].get(channel))
+        checkpoint["channel_versions"][channel] = new_versions[channel] = version
+    checkpoint["channel_values"] = dict(values)
+    return checkpoint, new_versions
+
+
+def put_chain(saver, thread_id, values_per_step):
+    """Store one checkpoint per entry, each the child of the one before; return their configs"""
+    configs, previous, config = [], None, thread_config(thread_id)
+    for step, values in enumerate(values_per_step):
+        checkpoint, new_versions = next_checkpoint(saver, previous, values)
+        config = saver.put(config, checkpoint, {"source": "loop", "step": step}, new_versions)
+        configs.append(config)
+        previous = checkpoint
+    return configs
+
+
+@pytest.fixture
+def saver(tmp_path):
+    return SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db"), compress_min_bytes=64)
+
+
+def test_put_and_get_tuple(saver):
+    first, second = put_chain(saver, "thread-1", [{"messages": ["hi"]}, {"messages": ["hi", "hello"]}])
+
+    latest = saver.get_tuple(thread_config("thread-1"))
+    assert latest.config == second
+    assert latest.checkpoint["channel_values"] == {"messages": ["hi", "hello"]}
+    assert latest.metadata["step"] == 1
+    assert latest.parent_config == first
+
+    earlier = saver.get_tuple(thread_config("thread-1", first["configurable"]["checkpoint_id"]))
+    assert earlier.checkpoint["channel_values"] == {"messages": ["hi"]}
+    assert earlier.parent_config is None
+
+
+def test_get_tuple_of_unknown_thread(saver):
+    assert saver.get_tuple(thread_config("missing")) is None
+
+
+def test_unchanged_channels_are_read_from_earlier_versions(saver):
+    put_chain(saver, "thread-1", [{"messages": ["hi"], "summary": "s"}, {"messages": ["hi", "hello"]}])
+
+    latest = saver.get_tuple(thread_config("thread-1"))
+    assert latest.checkpoint["channel_values"] == {"messages": ["hi", "hello"], "summary": "s"}
+
+
+def test_list_newest_first_with_filter_before_and_limit(saver):
+    configs = put_chain(saver, "thread-1", [{"messages": [n]} for n in range(4)])
+    put_chain(saver, "thread-2", [{"messages": ["other"]}])
+
+    listed = list(saver.list(thread_config("thread-1")))
+    assert [item.config for item in listed] == configs[::-1]
+
+    assert [item.metadata["step"] for item in saver.list(thread_config("thread-1"), filter={"step": 2})] == [2]
+    assert [item.config for item in saver.list(thread_config("thread-1"), before=configs[2])] == [configs[1], configs[0]]
+    assert len(list(saver.list(thread_config("thread-1"), limit=2))) == 2
+    assert len(list(saver.list(None))) == 5
+
+
+def test_put_writes_are_returned_as_pending_writes(saver):
+    (config,) = put_chain(saver, "thread-1", [{"messages": ["hi"]}])
+    task_id = str(uuid.uuid4())
+
+    saver.put_writes(config, [("messages", ["tool output"]), ("branch", "assistant")], task_id)
+    # The same writes again (a retried task) must not duplicate them
+    saver.put_writes(config, [("messages", ["tool output"]), ("branch", "assistant")], task_id)
+
+    pending = saver.get_tuple(config).pending_writes
+    assert pending == [(task_id, "messages", ["tool output"]), (task_id, "branch", "assistant")]
+
+
+def test_prune_thread_keeps_newest_checkpoints_and_their_values(saver):
+    configs = put_chain(saver, "thread-1", [{"messages": [n]} for n in range(5)])
+    saver.put_writes(configs[0], [("messages", ["stale"])], "task-old")
+    before = saver.thread_usage("thread-1")
+
+    assert saver.prune_thread("thread-1", keep_last=2) == 3
+
+    assert [item.config for item in saver.list(thread_config("thread-1"))] == configs[:-3:-1]
+    assert saver.get_tuple(thread_config("thread-1")).checkpoint["channel_values"] == {"messages": [4]}
+    after = saver.thread_usage("thread-1")
+    assert after["checkpoints"] == 2
+    assert after["bytes"] < before["bytes"]
+    blobs = saver._conn.execute("SELECT COUNT(*) FROM checkpoint_blobs WHERE thread_id = 'thread-1'").fetchone()[0]
+    writes = saver._conn.execute("SELECT COUNT(*) FROM checkpoint_writes WHERE thread_id = 'thread-1'").fetchone()[0]
+    assert (blobs, writes) == (2, 0)
+    # Nothing left to prune
+    assert saver.prune_thread("thread-1", keep_last=2) == 0
+
+
+def test_large_values_are_compressed_and_round_trip(saver):
+    large = ["a long tool output " * 50]
+    put_chain(saver, "thread-1", [{"messages": large, "small": "x"}])
+
+    types = dict(saver._conn.execute("SELECT channel, type FROM checkpoint_blobs").fetchall())
+    assert types["messages"].endswith("+zlib")
+    assert not types["small"].endswith("+zlib")
+    assert saver.get_tuple(thread_config("thread-1")).checkpoint["channel_values"] == {"messages": large, "small": "x"}
+
+
+def test_delete_thread(saver):
+    put_chain(saver, "thread-1", [{"messages": ["hi"]}])
+    put_chain(saver, "thread-2", [{"messages": ["hi"]}])
+
+    saver.delete_thread("thread-1")
+
+    assert saver.get_tuple(thread_config("thread-1")) is None
+    assert saver.get_tuple(thread_config("thread-2")) is not None
+
+
+def test_async_api_matches_sync(saver):
+    (config,) = put_chain(saver, "thread-1", [{"messages": ["hi"]}])
+
+    async def read():
+        latest = await saver.aget_tuple(thread_config("thread-1"))
+        return latest.config, [item.config async for item in saver.alist(thread_config("thread-1"))]
+
+    assert asyncio.run(read()) == (config, [config])
@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+from services.execution_match import database_version, fingerprint_query
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "results.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+        CREATE TABLE a (x, y);
+        INSERT INTO a VALUES (1, 2), (1, 3);
+        CREATE TABLE b (x, y);
+        INSERT INTO b VALUES (1, 2), (3, 1);
+    """)
+    conn.commit()
+    yield path
+    conn.close()
+
+
+def fingerprint(db_path, sql, **options):
+    return fingerprint_query(db_path, sql, **options)["fingerprint"]
+
+
+def test_row_order_is_ignored(db_path):
+    assert fingerprint(db_path, "SELECT x, y FROM a ORDER BY y") == fingerprint(db_path, "SELECT x, y FROM a ORDER BY y DESC")
+
+
+def test_column_order_is_ignored_consistently_across_rows(db_path):
+    assert fingerprint(db_path, "SELECT x, y FROM a") == fingerprint(db_path, "SELECT y, x FROM a")
+    # Sorting each row on its own would make {(1,2),(1,3)} equal {(1,2),(3,1)}
+    assert fingerprint(db_path, "SELECT x, y FROM a") != fingerprint(db_path, "SELECT x, y FROM b")
+
+
+def test_column_order_matters_when_not_ignored(db_path):
+    assert (fingerprint(db_path, "SELECT x, y FROM a", ignore_column_order=False)
+            != fingerprint(db_path, "SELECT y, x FROM a", ignore_column_order=False))
+
+
+def test_database_version_changes_only_with_the_contents(db_path):
+    version = database_version(db_path)
+    # Another reader opening the database leaves the version alone
+    reader = sqlite3.connect(db_path)
+    reader.execute("SELECT * FROM a").fetchall()
+    reader.close()
+    assert database_version(db_path) == version
+
+    writer = sqlite3.connect(db_path)
+    writer.execute("INSERT INTO a VALUES (5, 5)")
+    writer.commit()
+    writer.close()
+    assert database_version(db_path) != version
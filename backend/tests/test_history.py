@@ -0,0 +1,57 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agents.history import HistoryCompactor
+
+ELIDED = "[older schema output elided; see the latest get_schema result]"
+
+
+def compactor(**overrides):
+    return HistoryCompactor(None, dict({"keep_recent_turns": 2, "stale_tool_output_chars": 10}, **overrides))
+
+
+def schema_step(step, *tables):
+    calls = [{"name": "get_schema", "args": {"table_name": table}, "id": f"call_{step}_{table}"} for table in tables]
+    return [AIMessage(content="", tool_calls=calls)] + [
+        ToolMessage(content=f"schema of {table}", tool_call_id=call["id"], name="get_schema")
+        for table, call in zip(tables, calls)
+    ]
+
+
+def contents(messages):
+    return [message.content for message in messages if isinstance(message, ToolMessage)]
+
+
+def test_parallel_schema_outputs_of_the_current_step_are_kept():
+    messages = [HumanMessage(content="albums by artist")] + schema_step(0, "Album", "Artist")
+
+    assert contents(compactor()._elide_stale_tool_outputs(messages)) == ["schema of Album", "schema of Artist"]
+
+
+def test_schema_outputs_superseded_by_a_full_schema_are_elided():
+    messages = [HumanMessage(content="albums")] + schema_step(0, "Album") + schema_step(1, "all")
+
+    assert contents(compactor()._elide_stale_tool_outputs(messages)) == [ELIDED, "schema of all"]
+
+
+def test_schema_outputs_of_old_turns_are_elided_except_the_latest():
+    messages = (
+        [HumanMessage(content="first")] + schema_step(0, "Album") + [AIMessage(content="answer")]
+        + [HumanMessage(content="second")] + schema_step(1, "Genre") + [AIMessage(content="answer")]
+        + [HumanMessage(content="third")]
+    )
+
+    compacted = compactor(keep_recent_turns=1)._elide_stale_tool_outputs(messages)
+    assert contents(compacted) == [ELIDED, "schema of Genre"]
+
+
+def test_zero_recent_turns_keeps_only_the_latest_tool_step():
+    messages = (
+        [HumanMessage(content="first")]
+        + [AIMessage(content="", tool_calls=[{"name": "execute_sql_query", "args": {}, "id": "sql_0"}])]
+        + [ToolMessage(content="a long query result", tool_call_id="sql_0", name="execute_sql_query")]
+        + [AIMessage(content="", tool_calls=[{"name": "execute_sql_query", "args": {}, "id": "sql_1"}])]
+        + [ToolMessage(content="another long result", tool_call_id="sql_1", name="execute_sql_query")]
+    )
+
+    compacted = compactor(keep_recent_turns=0)._elide_stale_tool_outputs(messages)
+    assert contents(compacted) == ["a long que... [9 characters elided]", "another long result"]
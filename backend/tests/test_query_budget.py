@@ -0,0 +1,149 @@
+import sqlite3
+import threading
+
+import pytest
+
+from config import config
+from tools.execute_sql import _count_remaining
+from tools.query_budget import CancelScope, QueryBudget, query_cancel_scope, query_purpose
+
+# Never finishes on its own: only a budget or a cancel stops it
+ENDLESS = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT i FROM n"
+ENDLESS_COUNT = f"SELECT COUNT(*) FROM ({ENDLESS})"
+FINITE_COUNT = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 5000) SELECT COUNT(*) FROM n"
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def budgets(monkeypatch):
+    budgets = {"regular": {"timeout_ms": 1000}, "evaluator": {"timeout_ms": 50, "max_vm_steps": 5000}}
+    monkeypatch.setitem(config.tool_execute_sql, "budgets", budgets)
+    monkeypatch.setitem(config.tool_execute_sql, "budget_check_interval", 100)
+    return budgets
+
+
+def run_under(budget, conn, sql=ENDLESS_COUNT):
+    with budget.attach(conn):
+        return conn.execute(sql).fetchone()
+
+
+def test_zero_time_budget_aborts_at_once(conn):
+    budget = QueryBudget(timeout_ms=0, check_interval=100)
+
+    with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+        run_under(budget, conn)
+    assert budget.exceeded == "time budget exhausted"
+    assert budget.vm_steps == 100
+
+
+def test_vm_step_budget_aborts(conn):
+    budget = QueryBudget(max_vm_steps=5000, check_interval=100)
+
+    with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+        run_under(budget, conn)
+    assert budget.exceeded == "VM step budget exhausted"
+    assert budget.vm_steps == 5100
+
+
+def test_child_is_bounded_by_what_is_left_of_the_parent():
+    parent = QueryBudget(timeout_ms=0, max_vm_steps=5000)
+    parent.vm_steps = 6000
+
+    child = parent.child(1000)
+    assert (child.timeout_ms, child.max_vm_steps) == (0, 0)
+    # No parent limit: the child's own
+    assert QueryBudget().child(50).timeout_ms == 50
+
+
+def test_child_of_an_exhausted_parent_aborts(conn):
+    parent = QueryBudget(timeout_ms=0, check_interval=100)
+
+    with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+        run_under(parent.child(1000), conn)
+
+
+def test_count_runs_under_a_child_budget(conn):
+    budget = QueryBudget(timeout_ms=10_000, check_interval=100)
+    tool_config = {"count_mode": "exact", "count_timeout_ms": 50}
+
+    with budget.attach(conn):
+        cursor = conn.execute(ENDLESS)
+        fetched = len(cursor.fetchmany(5))
+        # The count runs out of time; the rows and the parent budget survive
+        assert _count_remaining(conn, cursor, ENDLESS, fetched, True, tool_config, budget) == (5, False)
+        assert budget.exceeded is None
+        counted_steps = budget.vm_steps
+        assert counted_steps > 0
+        assert conn.execute(FINITE_COUNT).fetchone() == (5000,)
+    assert budget.vm_steps > counted_steps
+
+
+def test_attach_restores_the_parent_progress_handler(conn):
+    parent = QueryBudget(max_vm_steps=10**9, check_interval=100)
+
+    with parent.attach(conn):
+        child = parent.child(None)
+        assert run_under(child, conn, FINITE_COUNT) == (5000,)
+        # The child's steps count against the parent
+        assert parent.vm_steps == child.vm_steps > 0
+        before = parent.vm_steps
+        conn.execute(FINITE_COUNT).fetchone()
+        assert parent.vm_steps > before
+    # Detached: later statements no longer count
+    after = parent.vm_steps
+    conn.execute(FINITE_COUNT).fetchone()
+    assert parent.vm_steps == after
+
+
+def test_budget_follows_the_query_purpose(budgets):
+    assert QueryBudget.for_purpose().timeout_ms == 1000
+
+    token = query_purpose.set("evaluator")
+    try:
+        budget = QueryBudget.for_purpose()
+    finally:
+        query_purpose.reset(token)
+    assert (budget.timeout_ms, budget.max_vm_steps, budget.check_interval) == (50, 5000, 100)
+    assert QueryBudget.for_purpose("evaluator").timeout_ms == 50
+    # Unknown purposes get the regular budget
+    assert QueryBudget.for_purpose("other").timeout_ms == 1000
+
+
+def test_cancel_scope_interrupts_a_running_statement(conn, budgets):
+    budgets["regular"] = {}  # Unlimited: only the cancel stops it
+    scope = CancelScope()
+    token = query_cancel_scope.set(scope)
+    try:
+        budget = QueryBudget.for_purpose()
+    finally:
+        query_cancel_scope.reset(token)
+
+    timer = threading.Timer(0.05, scope.cancel, args=("superseded",))
+    timer.start()
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+            run_under(budget, conn)
+    finally:
+        timer.cancel()
+    assert budget.exceeded == "superseded"
+
+
+def test_budget_started_after_the_cancel_aborts_at_once(conn, budgets):
+    budgets["regular"] = {}
+    scope = CancelScope()
+    scope.cancel()
+    token = query_cancel_scope.set(scope)
+    try:
+        budget = QueryBudget.for_purpose()
+    finally:
+        query_cancel_scope.reset(token)
+
+    assert budget.exceeded == "cancelled"
+    with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+        run_under(budget, conn)
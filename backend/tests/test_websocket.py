@@ -0,0 +1,61 @@
+import sqlite3
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, ToolMessage
+
+from config import config
+
+# Before the app is imported: services.session_manager builds the
+# process-wide checkpointer on import, and a test must not write to backend/cache
+config.checkpointer_config["backend"] = "memory"
+
+from app import app, regular_assistant
+from tools.schema_getters import schema_cache
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    db_path = tmp_path / "chat.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE Artist (ArtistId INTEGER PRIMARY KEY, Name TEXT)")
+        conn.execute("INSERT INTO Artist (Name) VALUES ('AC/DC'), ('Accept')")
+    monkeypatch.setitem(config.database_config, "default_path", str(db_path))
+    schema_cache.invalidate()
+    # Every question reaches the graph, and slowly enough to be cancelled mid-run
+    monkeypatch.setattr(regular_assistant, "answer_cache", None)
+    monkeypatch.setattr(regular_assistant.llm, "latency_ms", 300)
+    with TestClient(app) as client:
+        yield client
+
+
+def dangling_tool_calls(messages):
+    answered = {message.tool_call_id for message in messages if isinstance(message, ToolMessage)}
+    return [
+        call["id"]
+        for message in messages if isinstance(message, AIMessage)
+        for call in message.tool_calls if call["id"] not in answered
+    ]
+
+
+def test_cancel_stops_the_run_and_the_session_keeps_answering(client):
+    thread = {"configurable": {"thread_id": "cancel-session"}}
+    with client.websocket_connect("/ws/chat?session_id=cancel-session") as ws:
+        ws.send_json({"message": "How many artists are there?"})
+        time.sleep(0.1)  # Inside the first model call
+        ws.send_json({"type": "cancel"})
+
+        assert ws.receive_json() == {"type": "cancelled", "sessionId": "cancel-session"}
+        messages = regular_assistant.graph.get_state(thread).values["messages"]
+        assert messages[0].content == "How many artists are there?"
+        assert dangling_tool_calls(messages) == []
+
+        ws.send_json({"message": "Which artists are there?"})
+        response = ws.receive_json()
+
+    assert response["type"] == "ai_response"
+    assert response["content"].startswith("Answer:")
+    messages = regular_assistant.graph.get_state(thread).values["messages"]
+    assert isinstance(messages[-1], AIMessage) and not messages[-1].tool_calls
+    assert dangling_tool_calls(messages) == []
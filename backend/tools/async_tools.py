@@ -0,0 +1,71 @@
+import asyncio
+import contextvars
+import functools
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from langchain_core.tools import BaseTool, StructuredTool
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+from tools.get_schema import get_schema
+from tools.execute_sql import execute_sql_query
+from tools.query_data_dictionary import get_db_field_definition
+from services.metrics import tool_duration, tool_errors
+from services.tracing import tracer
+
+# Dedicated, bounded pool so SQLite and pandas work never runs on the event loop
+# and cannot starve the default executor used by the rest of the app
+_executor = ThreadPoolExecutor(
+    max_workers=config.tool_executor_config.get('max_workers', 8),
+    thread_name_prefix="sql_matic_tool",
+)
+
+
+async def run_in_tool_executor(func, *args, **kwargs):
+    """Run a blocking callable on the tool thread pool, preserving contextvars"""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(ctx.run, func, *args, **kwargs))
+
+
+def to_async_tool(sync_tool: BaseTool) -> StructuredTool:
+    """Wrap a sync @tool so its async path offloads to the tool thread pool"""
+    # Series resolved once, so a call only pays for the updates
+    duration = tool_duration.labels(tool=sync_tool.name)
+    errors = tool_errors.labels(tool=sync_tool.name)
+
+    async def coroutine(**kwargs):
+        with tracer.span(f"tool.{sync_tool.name}", args=kwargs) as span:
+            start = time.perf_counter()
+            try:
+                result = await run_in_tool_executor(sync_tool.func, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                duration.observe(time.perf_counter() - start)
+            if isinstance(result, dict):
+                span.set(**{key: result[key] for key in ("row_count", "total_count", "error") if key in result})
+                if "error" in result:
+                    errors.inc()
+            return result
+
+    return StructuredTool.from_function(
+        func=sync_tool.func,
+        coroutine=coroutine,
+        name=sync_tool.name,
+        description=sync_tool.description,
+        args_schema=sync_tool.args_schema,
+    )
+
+
+async_get_schema = to_async_tool(get_schema)
+async_execute_sql_query = to_async_tool(execute_sql_query)
+async_get_db_field_definition = to_async_tool(get_db_field_definition)
+
+ASYNC_TOOLS = [async_get_schema, async_execute_sql_query, async_get_db_field_definition]
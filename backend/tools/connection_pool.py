@@ -0,0 +1,192 @@
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within pool_timeout"""
+    pass
+
+
+class SQLiteConnectionPool:
+    '''Bounded pool of read-only SQLite connections for a single database file.
+
+    Up to ``pool_size`` idle connections are kept open so their page cache,
+    parsed schema and prepared-statement cache stay warm between tool calls.
+    Bursts may open up to ``max_overflow`` extra connections, which are closed
+    again on release. Connections older than ``pool_recycle`` seconds are
+    replaced on checkout.
+    '''
+
+    def __init__(
+        self,
+        db_path: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30,
+        pool_recycle: float = 3600,
+        options: Optional[Dict] = None,
+    ):
+        self.db_path = os.path.abspath(db_path)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.options = options or {}
+
+        # LIFO so the most recently used (warmest) connection is reused first
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._slots = threading.BoundedSemaphore(pool_size + max_overflow)
+        self._created_at: Dict[int, float] = {}
+        self._closed = False
+
+        if self.options.get('journal_mode'):
+            self._set_journal_mode(self.options['journal_mode'])
+
+    def _set_journal_mode(self, journal_mode: str):
+        # journal_mode is persistent and needs a writable handle, so set it once here
+        if not os.path.exists(self.db_path):
+            return
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=self.options.get('timeout', 30))
+            try:
+                conn.execute(f"PRAGMA journal_mode={journal_mode}")
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.options.get('read_only', True):
+            target = f"{Path(self.db_path).as_uri()}?mode=ro"
+        else:
+            target = Path(self.db_path).as_uri()
+        conn = sqlite3.connect(
+            target,
+            uri=True,
+            timeout=self.options.get('timeout', 30),
+            check_same_thread=False,
+            cached_statements=self.options.get('statement_cache_size', 128),
+        )
+        if self.options.get('mmap_size') is not None:
+            conn.execute(f"PRAGMA mmap_size={int(self.options['mmap_size'])}")
+        if self.options.get('cache_size') is not None:
+            conn.execute(f"PRAGMA cache_size={int(self.options['cache_size'])}")
+        if self.options.get('read_only', True):
+            conn.execute("PRAGMA query_only=1")
+        self._created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection):
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise PoolTimeoutError(f"Connection pool for {self.db_path} is closed")
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            raise PoolTimeoutError(
+                f"No connection available for {self.db_path} within {self.pool_timeout}s "
+                f"(pool_size={self.pool_size}, max_overflow={self.max_overflow})"
+            )
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - self._created_at.get(id(conn), 0) > self.pool_recycle:
+                    self._discard(conn)
+                    continue
+                return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: sqlite3.Connection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                self._discard(conn)
+                return
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                # Overflow connection: close it instead of keeping it idle
+                self._discard(conn)
+        except sqlite3.Error:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> SQLiteConnectionPool:
+    """Return the process-wide pool for db_path, creating it from database config"""
+    key = os.path.abspath(db_path)
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            database_config = config.database_config
+            pool = SQLiteConnectionPool(
+                key,
+                pool_size=database_config.get('pool_size', 5),
+                max_overflow=database_config.get('max_overflow', 10),
+                pool_timeout=database_config.get('pool_timeout', 30),
+                pool_recycle=database_config.get('pool_recycle', 3600),
+                options={
+                    'timeout': database_config.get('timeout', 30),
+                    'read_only': database_config.get('read_only', True),
+                    'journal_mode': database_config.get('journal_mode'),
+                    'mmap_size': database_config.get('mmap_size'),
+                    'cache_size': database_config.get('cache_size'),
+                    'statement_cache_size': database_config.get('statement_cache_size', 128),
+                },
+            )
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
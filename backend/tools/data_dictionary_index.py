@@ -0,0 +1,126 @@
+import bisect
+import csv
+import os
+import threading
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+
+class DataDictionaryIndex:
+    '''Compact in-memory index over the data dictionary CSV.
+
+    Rows are kept as tuples of the configured return columns. Column and table
+    names are indexed (lower-cased) for exact lookups through a dict, prefix
+    lookups through a sorted key list and substring lookups through a trigram
+    index. Lookups stop as soon as enough matches are found, so a query never
+    scans the whole dictionary.
+    '''
+
+    def __init__(self, path: str, name_columns: Sequence[str], return_columns: Optional[Sequence[str]] = None):
+        self.path = path
+        self.name_columns = list(name_columns)
+        self.requested_columns = list(return_columns) if return_columns else None
+        self.return_columns: List[str] = []
+        self.rows: List[Tuple] = []
+        self.mtime_ns: Optional[int] = None
+        # One set of lookup structures per indexed name column
+        self._exact: Dict[str, Dict[str, List[int]]] = {}
+        self._sorted_keys: Dict[str, List[str]] = {}
+        self._trigrams: Dict[str, Dict[str, List[str]]] = {}
+
+    def load(self):
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        with open(self.path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = [name.strip() for name in next(reader)]
+            return_columns = self.requested_columns or header
+            missing = [name for name in return_columns + self.name_columns if name not in header]
+            if missing:
+                raise ValueError(f"Data dictionary is missing columns: {missing}")
+            positions = [header.index(name) for name in return_columns]
+            rows = [tuple(record[i] if i < len(record) else '' for i in positions) for record in reader if record]
+
+        exact, sorted_keys, trigrams = {}, {}, {}
+        for name_column in self.name_columns:
+            pos = return_columns.index(name_column) if name_column in return_columns else None
+            if pos is None:
+                raise ValueError(f"Indexed column '{name_column}' must be one of the return columns")
+            by_name: Dict[str, List[int]] = {}
+            for row_id, row in enumerate(rows):
+                by_name.setdefault(row[pos].strip().lower(), []).append(row_id)
+            keys = sorted(by_name)
+            grams: Dict[str, List[str]] = {}
+            for key in keys:
+                for gram in {key[i:i + 3] for i in range(len(key) - 2)}:
+                    grams.setdefault(gram, []).append(key)
+            exact[name_column] = by_name
+            sorted_keys[name_column] = keys
+            trigrams[name_column] = grams
+
+        self.return_columns = list(return_columns)
+        self.rows = rows
+        self._exact, self._sorted_keys, self._trigrams = exact, sorted_keys, trigrams
+        self.mtime_ns = mtime_ns
+
+    def _prefix_keys(self, name_column: str, term: str) -> Iterator[str]:
+        keys = self._sorted_keys[name_column]
+        for i in range(bisect.bisect_left(keys, term), len(keys)):
+            if not keys[i].startswith(term):
+                break
+            yield keys[i]
+
+    def _substring_keys(self, name_column: str, term: str) -> Iterator[str]:
+        if len(term) < 3:
+            return (key for key in self._sorted_keys[name_column] if term in key)
+        # Every match contains all of the term's trigrams, so scanning the
+        # rarest one's (sorted) posting list and verifying is enough
+        grams = self._trigrams[name_column]
+        postings = [grams.get(term[i:i + 3], []) for i in range(len(term) - 2)]
+        return (key for key in min(postings, key=len) if term in key)
+
+    def _matching_row_ids(self, term: str) -> Iterator[int]:
+        seen: Set[int] = set()
+        for lookup in ('exact', 'prefix', 'substring'):
+            for name_column in self.name_columns:
+                if lookup == 'exact':
+                    keys = [term] if term in self._exact[name_column] else []
+                elif lookup == 'prefix':
+                    keys = self._prefix_keys(name_column, term)
+                else:
+                    keys = self._substring_keys(name_column, term)
+                for key in keys:
+                    for row_id in self._exact[name_column][key]:
+                        if row_id not in seen:
+                            seen.add(row_id)
+                            yield row_id
+
+    def search(self, term: str, max_results: Optional[int] = None) -> Tuple[List[Dict], bool]:
+        """Return (matching rows, whether more matches exist), ranked exact > prefix > substring
+        and column-name matches before table-name matches"""
+        row_ids = self._matching_row_ids(term.strip().lower())
+        # Stop as soon as one match past max_results is found
+        limited = list(islice(row_ids, max_results + 1)) if max_results else list(row_ids)
+        has_more = bool(max_results) and len(limited) > max_results
+        if has_more:
+            limited = limited[:max_results]
+        return [dict(zip(self.return_columns, self.rows[row_id])) for row_id in limited], has_more
+
+
+_indexes: Dict[Tuple, DataDictionaryIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_data_dictionary_index(path: str, name_columns: Sequence[str], return_columns: Optional[Sequence[str]] = None) -> DataDictionaryIndex:
+    """Return the cached index for path, reloading it only when the file's mtime changes"""
+    key = (os.path.abspath(path), tuple(name_columns), tuple(return_columns or ()))
+    index = _indexes.get(key)
+    mtime_ns = os.stat(path).st_mtime_ns
+    if index is not None and index.mtime_ns == mtime_ns:
+        return index
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.mtime_ns != mtime_ns:
+            index = DataDictionaryIndex(path, name_columns, return_columns)
+            index.load()
+            _indexes[key] = index
+        return index
@@ -0,0 +1,161 @@
+import csv
+import os
+import pickle
+import re
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+INDEX_FORMAT_VERSION = 1
+
+_CAMEL_BOUNDARY = re.compile(r'(?<=[a-z0-9])(?=[A-Z])|_')
+
+
+def split_identifier(name: str) -> str:
+    """'CustomerId' / 'CUST_ID' -> 'Customer Id' / 'CUST ID' so names share terms with descriptions"""
+    return _CAMEL_BOUNDARY.sub(' ', name)
+
+
+class DictionarySearchIndex:
+    '''TF-IDF index over data dictionary entries for concept-level search.
+
+    Each row is a document made of its table name, column name (identifiers
+    split into words) and description. The vectorizer is fitted once and the
+    L2-normalized document matrix kept as CSR, so scoring a query is a single
+    sparse matrix-vector product. The fitted index is pickled next to a
+    signature of the source file and reused by later processes.
+    '''
+
+    def __init__(self, path: str, table_column: str, field_column: str, text_columns: Sequence[str], return_columns: Sequence[str]):
+        self.path = path
+        self.table_column = table_column
+        self.field_column = field_column
+        self.text_columns = list(text_columns)
+        self.return_columns = list(return_columns)
+        self.rows: List[Tuple] = []
+        self.vectorizer = None
+        self.matrix = None
+        self.signature: Optional[Tuple] = None
+
+    def _source_signature(self) -> Tuple:
+        import sklearn
+
+        stat = os.stat(self.path)
+        return (
+            stat.st_mtime_ns, stat.st_size, os.path.abspath(self.path), INDEX_FORMAT_VERSION, sklearn.__version__,
+            self.table_column, self.field_column, tuple(self.text_columns), tuple(self.return_columns),
+        )
+
+    def _documents(self) -> List[str]:
+        with open(self.path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            records = [{key.strip(): value for key, value in record.items() if key} for record in reader]
+        self.rows = [tuple(record.get(name, '') for name in self.return_columns) for record in records]
+        return [
+            ' '.join(
+                [split_identifier(record.get(name, '')) for name in (self.table_column, self.field_column)]
+                + [record.get(name, '') for name in self.text_columns]
+            )
+            for record in records
+        ]
+
+    def fit(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        documents = self._documents()
+        self.vectorizer = TfidfVectorizer(
+            lowercase=True,
+            strip_accents='unicode',
+            stop_words='english',
+            ngram_range=(1, 2),
+            sublinear_tf=True,
+        )
+        # TfidfVectorizer rows are already L2-normalized: dot product == cosine
+        self.matrix = self.vectorizer.fit_transform(documents).tocsr()
+        self.signature = self._source_signature()
+
+    def load_or_fit(self, index_path: Optional[str] = None):
+        signature = self._source_signature()
+        if index_path and os.path.exists(index_path):
+            try:
+                with open(index_path, 'rb') as f:
+                    stored = pickle.load(f)
+                if stored['signature'] == signature:
+                    self.rows = stored['rows']
+                    self.vectorizer = stored['vectorizer']
+                    self.matrix = stored['matrix']
+                    self.signature = signature
+                    return
+            except Exception:
+                # Stale or unreadable index file: refit below
+                pass
+
+        self.fit()
+        if index_path:
+            os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+            tmp_path = f"{index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(
+                    {'signature': self.signature, 'rows': self.rows,
+                     'vectorizer': self.vectorizer, 'matrix': self.matrix},
+                    f, protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            # Atomic so concurrently starting workers never read a partial file
+            os.replace(tmp_path, index_path)
+
+    def search(self, query: str, top_k: int = 5, min_score: float = 0.0) -> Dict:
+        """Return the top_k columns and the tables they belong to, best first"""
+        query_vector = self.vectorizer.transform([split_identifier(query)])
+        scores = (self.matrix @ query_vector.T).toarray().ravel()
+        candidates = np.flatnonzero(scores > min_score)
+        if candidates.size > top_k:
+            candidates = candidates[np.argpartition(scores[candidates], -top_k)[-top_k:]]
+        ranked = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        results = []
+        tables: Dict[str, float] = {}
+        table_position = self.return_columns.index(self.table_column) if self.table_column in self.return_columns else None
+        for row_id in ranked:
+            score = float(scores[row_id])
+            result = dict(zip(self.return_columns, self.rows[row_id]))
+            result['score'] = round(score, 4)
+            results.append(result)
+            if table_position is not None:
+                table = self.rows[row_id][table_position]
+                tables[table] = max(tables.get(table, 0.0), score)
+
+        return {
+            "results": results,
+            "tables": [
+                {"table": table, "score": round(score, 4)}
+                for table, score in sorted(tables.items(), key=lambda item: -item[1])
+            ],
+        }
+
+
+_indexes: Dict[Tuple, DictionarySearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_dictionary_search_index(
+    path: str,
+    table_column: str,
+    field_column: str,
+    text_columns: Sequence[str],
+    return_columns: Sequence[str],
+    index_path: Optional[str] = None,
+) -> DictionarySearchIndex:
+    """Return the fitted search index for path, refitting only when the source file changes"""
+    key = (os.path.abspath(path), table_column, field_column, tuple(text_columns), tuple(return_columns))
+    stat = os.stat(path)
+    index = _indexes.get(key)
+    if index is not None and index.signature[:2] == (stat.st_mtime_ns, stat.st_size):
+        return index
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.signature[:2] != (stat.st_mtime_ns, stat.st_size):
+            index = DictionarySearchIndex(path, table_column, field_column, text_columns, return_columns)
+            index.load_or_fit(index_path)
+            _indexes[key] = index
+        return index
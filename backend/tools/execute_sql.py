@@ -11,6 +11,72 @@ project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
 from config import config
+from tools.connection_pool import get_pool
+from tools.query_budget import QueryBudget
+from tools.result_cache import result_cache
+from services.metrics import sql_rows_returned, sql_rows_scanned, sql_vm_steps
+
+def _count_remaining(conn, cursor, query: str, fetched: int, has_more: bool, tool_config: dict, budget: QueryBudget):
+    '''
+    Work out the total row count without materializing the result set.
+    Returns (total_count, is_exact); total_count is None when unknown.
+    count_mode:
+        - none: do not count beyond the rows already fetched
+        - capped: keep stepping the cursor, up to count_cap rows
+        - exact: run COUNT(*) over the query
+    Counting runs under a child of the query budget limited to count_timeout_ms,
+    so running out of time only loses the exact count, not the rows.
+    '''
+    if not has_more:
+        return fetched, True
+
+    count_mode = tool_config.get('count_mode', 'capped').lower()
+    count_budget = budget.child(tool_config.get('count_timeout_ms', 1000))
+    if count_mode == 'capped':
+        count_cap = tool_config.get('count_cap', 10000)
+        chunk_size = tool_config.get('count_chunk_size', 1000)
+        # The probe row fetched to detect truncation is already past max_results
+        total = fetched + 1
+        try:
+            with count_budget.attach(conn):
+                while total < count_cap:
+                    chunk = cursor.fetchmany(min(chunk_size, count_cap - total))
+                    if not chunk:
+                        return total, True
+                    total += len(chunk)
+                # Reaching the cap exactly may still mean the result ends there
+                if not cursor.fetchone():
+                    return total, True
+        except sqlite3.OperationalError:
+            if not count_budget.exceeded:
+                raise
+        return total, False
+
+    if count_mode == 'exact':
+        cursor.close()
+        count_query = f"SELECT COUNT(*) FROM ({query.strip().rstrip(';')})"
+        try:
+            with count_budget.attach(conn):
+                return conn.execute(count_query).fetchone()[0], True
+        except sqlite3.Error:
+            # Timed out or not countable (e.g. PRAGMA); fall back to a lower bound
+            return fetched, False
+
+    return None, False
+
+
+def _aborted_result(budget: QueryBudget) -> dict:
+    stats = budget.describe()
+    return {
+        "error": (
+            f"Query aborted after {stats['elapsed_ms']:.0f} ms / {stats['vm_steps']} steps "
+            f"({budget.exceeded}). Rewrite the query to be cheaper: add filters or a LIMIT, "
+            "avoid cartesian joins and unbounded recursive CTEs."
+        ),
+        "aborted": True,
+        "reason": budget.exceeded,
+        **stats,
+    }
 
 @tool
 def execute_sql_query(query: str,max_results:int=None) -> dict:
@@ -23,6 +89,7 @@ def execute_sql_query(query: str,max_results:int=None) -> dict:
         dict: Contains:
             - message: Summary of results
             - row_count: Number of rows
+            - total_count: Total rows (lower bound unless total_count_exact)
             - columns: Column names
             - results: Query results
             - format: Result format
@@ -38,40 +105,84 @@ def execute_sql_query(query: str,max_results:int=None) -> dict:
             max_results = tool_config.get('max_results', 100)
         return_format = tool_config.get('return_format', 'json')
         db_path = database_config.get('default_path', 'database.db')
+
+        # Serve repeated queries from the result cache while the data is unchanged
+        use_cache = tool_config.get('result_cache', {}).get('enabled', True)
+        if use_cache:
+            cache_key = result_cache.make_key(
+                str(db_path), query, max_results, return_format, tool_config.get('count_mode', 'capped')
+            )
+            cached, db_version = result_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-        with sqlite3.connect(str(db_path)) as conn:
-            cursor = conn.cursor()
-            cursor.execute(query)
-            
-            # Get column names
-            column_names = [description[0] for description in cursor.description] if cursor.description else []
-            
-            # Fetch limited results
-            results = cursor.fetchall()
-            limited_results = results[:max_results]
+        # Per-query budget for the calling assistant's purpose (regular/evaluator)
+        budget = QueryBudget.for_purpose()
+
+        try:
+            # Pooled read-only connection keeps page and statement caches warm
+            with get_pool(str(db_path)).connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    with budget.attach(conn):
+                        cursor.execute(query)
+
+                        # Get column names
+                        column_names = [description[0] for description in cursor.description] if cursor.description else []
+
+                        # Fetch only max_results rows (plus one to detect truncation)
+                        limited_results = cursor.fetchmany(max_results + 1)
+                        has_more = len(limited_results) > max_results
+                        limited_results = limited_results[:max_results]
+                        total_count, count_is_exact = _count_remaining(
+                            conn, cursor, query, len(limited_results), has_more, tool_config, budget
+                        )
+                except sqlite3.OperationalError:
+                    if budget.exceeded:
+                        return _aborted_result(budget)
+                    raise
+                if budget.exceeded:
+                    return _aborted_result(budget)
             
-            # Format results according to return_format
-            formatted_data = None
-            if return_format.lower() == 'json':
-                formatted_data = [dict(zip(column_names, row)) for row in limited_results]
-            elif return_format.lower() == 'csv':
-                output = StringIO()
-                csv_writer = csv.writer(output)
-                csv_writer.writerow(column_names)
-                csv_writer.writerows(limited_results)
-                formatted_data = output.getvalue()
-            elif return_format.lower() == 'list':
-                formatted_data = limited_results
-            else:
-                formatted_data = limited_results
+                # Format results according to return_format
+                formatted_data = None
+                if return_format.lower() == 'json':
+                    formatted_data = [dict(zip(column_names, row)) for row in limited_results]
+                elif return_format.lower() == 'csv':
+                    output = StringIO()
+                    csv_writer = csv.writer(output)
+                    csv_writer.writerow(column_names)
+                    csv_writer.writerows(limited_results)
+                    formatted_data = output.getvalue()
+                elif return_format.lower() == 'list':
+                    formatted_data = limited_results
+                else:
+                    formatted_data = limited_results
             
-            return {
-                "message": f"{len(results)} results found (limited to {max_results})",
-                "row_count": len(limited_results),
-                "columns": column_names,
-                "results": formatted_data,
-                "format": return_format
-            }
+                if total_count is None:
+                    summary = f"More than {len(limited_results)} results found"
+                elif count_is_exact:
+                    summary = f"{total_count} results found"
+                else:
+                    summary = f"More than {total_count} results found"
+
+                result = {
+                    "message": f"{summary} (limited to {max_results})",
+                    "row_count": len(limited_results),
+                    "total_count": total_count,
+                    "total_count_exact": count_is_exact,
+                    "columns": column_names,
+                    "results": formatted_data,
+                    "format": return_format
+                }
+                if use_cache:
+                    result_cache.put(cache_key, db_version, result)
+                sql_rows_returned.inc(len(limited_results))
+                sql_rows_scanned.inc(total_count if total_count is not None else len(limited_results))
+                return result
+        finally:
+            # Also for aborted statements: the runaway queries are the costliest
+            sql_vm_steps.inc(budget.vm_steps)
             
     except Exception as e:
         return {"error": str(e)}
@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, Optional
 import sys
 from pathlib import Path
 from langchain_core.tools import tool
@@ -8,57 +8,37 @@ project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
 from config import config
-from tools.schema_getters import SQLiteSchemaGetter
+from tools.schema_getters import schema_cache
 
 
-@tool
-def get_schema(table_name: str = "all") -> Dict:
-    """
-    Get the schema of the database.
-    Args:
-        table_name (str): The name of the table to get the schema for.
-        If 'all', retrieves the schema for all tables.
-
-    Returns:
-        Dict: A dictionary containing the schema information or an error message.
-    Example:
-        get_schema('all')
-        get_schema('CI_ACCT')
-    """
-    print(f"[TOOL] get_schema {table_name}")
-
+def read_schema(table_name: str = "all", output_format: Optional[str] = None) -> Dict:
+    """get_schema without the tool wrapper; output_format overrides tool_get_schema.output_format"""
     database_config = config.database_config
     tool_config = config.tool_get_schema
     db_type = database_config.get("type", "sqlite")
+    compact = (output_format or tool_config.get("output_format", "json")) == "compact"
 
-    getter = SQLiteSchemaGetter(
-        db_path=database_config.get("default_path"), config=tool_config
-    )
-
-    schema_info = getter.get_schema()
+    # Served from the process-wide cache; only re-introspected on DDL changes
+    snapshot = schema_cache.get(database_config.get("default_path"), tool_config)
+    schema_info = snapshot.schema
 
     if table_name.lower() != "all":
-        # Filter for specific table
-        matching_tables = [
-            table
-            for table in schema_info["tables"]
-            if table["name"].lower() == table_name.lower()
-        ]
+        # O(1) lookup through the snapshot's name index
+        table = snapshot.table(table_name)
 
-        if not matching_tables:
+        if table is None:
             return {
                 "error": f"Table '{table_name}' not found in the database schema.",
-                "available_tables": [table["name"] for table in schema_info["tables"]],
+                "available_tables": snapshot.table_names,
             }
 
-        filtered_schema = {
-            "tables": matching_tables,
-            "indexes": [
-                idx
-                for idx in schema_info.get("indexes", [])
-                if idx["table"].lower() == table_name.lower()
-            ],
-        }
+        if compact:
+            filtered_schema = snapshot.compact(table_name)
+        else:
+            filtered_schema = {
+                "tables": [table],
+                "indexes": snapshot.indexes(table_name),
+            }
 
         return {
             "Tool Message: >>> ": f"Schema retrieved successfully for table {table_name}",
@@ -67,10 +47,29 @@ def get_schema(table_name: str = "all") -> Dict:
 
     return {
         "Tool Message: >>> ": f"Schema retrieved successfully for {db_type} database.",
-        "schema": schema_info,
+        "schema": snapshot.compact() if compact else schema_info,
     }
 
 
+@tool
+def get_schema(table_name: str = "all") -> Dict:
+    """
+    Get the schema of the database.
+    Args:
+        table_name (str): The name of the table to get the schema for.
+        If 'all', retrieves the schema for all tables.
+
+    Returns:
+        Dict: A dictionary containing the schema information or an error message.
+        In compact format the schema is one line per table:
+        Table(column TYPE PK, column TYPE -> OtherTable.column, ...) | INDEX name(columns)
+    Example:
+        get_schema('all')
+        get_schema('CI_ACCT')
+    """
+    print(f"[TOOL] get_schema {table_name}")
+    return read_schema(table_name)
+
 if __name__ == "__main__":
     result = get_schema("all")
     print(result)
@@ -0,0 +1,159 @@
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+
+# Assistant purpose ('regular' / 'evaluator') of the request currently running
+# tools; set by SQLQueryAssistant and carried into tool threads via contextvars
+query_purpose: ContextVar[str] = ContextVar('query_purpose', default='regular')
+
+
+class CancelScope:
+    """The budgets of the statements started by one assistant run, so cancelling the run interrupts them"""
+
+    def __init__(self):
+        self._budgets: "weakref.WeakSet[QueryBudget]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self.cancelled: Optional[str] = None
+
+    def register(self, budget: 'QueryBudget'):
+        with self._lock:
+            self._budgets.add(budget)
+            cancelled = self.cancelled
+        if cancelled:
+            # Started on a tool thread after the run was already cancelled
+            budget.cancel(cancelled)
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            self.cancelled = reason
+            budgets = list(self._budgets)
+        for budget in budgets:
+            budget.cancel(reason)
+
+
+# Cancellation scope of the run currently using tools; like query_purpose it
+# reaches tool threads through the copied context
+query_cancel_scope: ContextVar[Optional[CancelScope]] = ContextVar('query_cancel_scope', default=None)
+
+
+class QueryBudget:
+    '''Wall-clock and VM-step budget for one SQLite statement.
+
+    Enforced with ``set_progress_handler``: every ``check_interval`` virtual
+    machine instructions the handler checks the budget and aborts the running
+    statement once it is exhausted. ``cancel()`` aborts it from another thread.
+    '''
+
+    def __init__(
+        self,
+        timeout_ms: Optional[float] = None,
+        max_vm_steps: Optional[int] = None,
+        check_interval: int = 10000,
+        parent: Optional['QueryBudget'] = None,
+    ):
+        self.timeout_ms = timeout_ms
+        self.max_vm_steps = max_vm_steps
+        self.check_interval = check_interval
+        self.parent = parent
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + timeout_ms / 1000 if timeout_ms is not None else None
+        self.vm_steps = 0
+        self.exceeded: Optional[str] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_purpose(cls, purpose: Optional[str] = None) -> 'QueryBudget':
+        """Build the budget configured for an assistant purpose"""
+        tool_config = config.tool_execute_sql
+        budgets = tool_config.get('budgets', {})
+        budget = budgets.get(purpose or query_purpose.get(), budgets.get('regular', {}))
+        query_budget = cls(
+            timeout_ms=budget.get('timeout_ms'),
+            max_vm_steps=budget.get('max_vm_steps'),
+            check_interval=tool_config.get('budget_check_interval', 10000),
+        )
+        cancel_scope = query_cancel_scope.get()
+        if cancel_scope is not None:
+            cancel_scope.register(query_budget)
+        return query_budget
+
+    def child(self, timeout_ms: Optional[float]) -> 'QueryBudget':
+        """A tighter budget for a follow-up statement, bounded by what is left of this one"""
+        remaining_ms = self.remaining_ms()
+        if remaining_ms is not None:
+            timeout_ms = remaining_ms if timeout_ms is None else min(timeout_ms, remaining_ms)
+        max_vm_steps = None
+        if self.max_vm_steps is not None:
+            max_vm_steps = max(self.max_vm_steps - self.vm_steps, 0)
+        return QueryBudget(timeout_ms, max_vm_steps, self.check_interval, parent=self)
+
+    def remaining_ms(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max((self.deadline - time.monotonic()) * 1000, 0)
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started_at) * 1000
+
+    def _progress(self) -> int:
+        self.vm_steps += self.check_interval
+        if self.exceeded:
+            return 1
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.exceeded = "time budget exhausted"
+        elif self.max_vm_steps is not None and self.vm_steps > self.max_vm_steps:
+            self.exceeded = "VM step budget exhausted"
+        return 1 if self.exceeded else 0
+
+    @contextmanager
+    def attach(self, conn: sqlite3.Connection) -> Iterator['QueryBudget']:
+        """Enforce this budget on conn for the duration of the block"""
+        if self.timeout_ms is None and self.max_vm_steps is None and self.parent is None and not self.exceeded:
+            # Unlimited: still allow cancel() through conn.interrupt(); a budget
+            # cancelled before attaching keeps the handler, which aborts at once
+            handler = None
+        else:
+            handler = self._progress
+        with self._lock:
+            self._conn = conn
+        if handler:
+            conn.set_progress_handler(handler, self.check_interval)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._conn = None
+            if self.parent is not None and self.parent._conn is conn:
+                self.parent.vm_steps += self.vm_steps
+                conn.set_progress_handler(self.parent._progress, self.parent.check_interval)
+            else:
+                conn.set_progress_handler(None, 0)
+
+    def cancel(self, reason: str = "cancelled"):
+        """Abort the statement currently running under this budget, from any thread"""
+        self.exceeded = reason
+        with self._lock:
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def describe(self) -> Dict:
+        return {
+            "elapsed_ms": round(self.elapsed_ms, 1),
+            "vm_steps": self.vm_steps,
+            "timeout_ms": self.timeout_ms,
+            "max_vm_steps": self.max_vm_steps,
+        }
@@ -1,4 +1,3 @@
-import pandas as pd
 import sys
 from pathlib import Path
 from langchain_core.tools import tool
@@ -8,61 +7,108 @@ from langchain_core.tools import tool
 project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
+from config import config
+from tools.data_dictionary_index import get_data_dictionary_index
+from tools.dictionary_search import get_dictionary_search_index
+
 
 @tool
-def get_db_field_definition(column_name: str):
+def get_db_field_definition(column_name: str, mode: str = "name"):
     '''
-    Get the definition of a database field from the simplified data dictionary.
+    Get the definition of a database field from the data dictionary.
     Args:
-        column_name (str): The name of the database field to search for.
+        column_name (str): The name of the database field (or table) to search for,
+            or a plain-language concept when mode is "semantic".
+        mode (str): "name" matches column and table names (exact, then prefix, then substring).
+            "semantic" ranks columns by how well their descriptions match a concept
+            such as "customer lifetime spend" and also returns the best matching tables.
     Returns:
-        dict: A dictionary containing the field definition or an error message.
+        dict: A dictionary containing the field definitions or an error message.
     Example:
-        get_db_field_definition("ACCT_ID")
+        get_db_field_definition("ArtistId")
         # Returns:
         {
-            "Tool Message: >>> ": "1 results found:",
+            "Tool Message: >>> ": "2 results found:",
+            "row_count": 2,
+            "columns": ["Column Name", "Table Name", "Data Type", "Description"],
             "results": [
                 {
-                    "domain": "Account",
-                    "table": "CI_ACCT",
-                    "column": "ACCT_ID",
-                    "key_type": "PK",
-                    "description": "Primary identifier for customer accounts"
-                }
+                    "Column Name": "ArtistId",
+                    "Table Name": "Artist",
+                    "Data Type": "INTEGER",
+                    "Description": "Unique identifier for each artist."
+                },
+                ...
             ]
         }
     '''
-    print(f"[TOOL][Api call] => get_db_field_definition({column_name})")
+    print(f"[TOOL][Api call] => get_db_field_definition({column_name}, mode={mode})")
+
+    tool_config = config.tool_get_data_dictionary
+    dictionary_path = project_root / tool_config.get('file_path', 'Database_Data_Dictionary_with_Descriptions.csv')
+    name_columns = [tool_config.get('filter_column', 'Column Name'), tool_config.get('table_column', 'Table Name')]
+    max_results = tool_config.get('max_results', 5)
+
+    if mode.lower() == "semantic":
+        return _semantic_search(column_name, dictionary_path, tool_config)
 
-    # Use the simplified data dictionary path
-    simplified_dict_path = Path(__file__).resolve().parent.parent / "files" / "simplified_data_dictionary_with_keys.csv"
-    
     try:
-        # Read the simplified data dictionary
-        df = pd.read_csv(simplified_dict_path)
-        
-        # Filter data by Column name
-        filtered_df = df[df['Column'].str.contains(column_name, case=False, na=False)]
-        
-        if filtered_df.empty:
+        # Loaded once and reloaded only when the file's mtime changes
+        index = get_data_dictionary_index(str(dictionary_path), name_columns, tool_config.get('return_columns'))
+        results, has_more = index.search(column_name, max_results)
+
+        if not results:
             return {"error": f"Field '{column_name}' not found in data dictionary"}
-        
-        # Return all matching fields with their descriptions
-        results = filtered_df.to_dict('records')
+
         return {
-            "Tool Message: >>> ": f"{len(results)} results found:",
+            "Tool Message: >>> ": (
+                f"More than {len(results)} results found (showing the best {len(results)}):"
+                if has_more else f"{len(results)} results found:"
+            ),
             "row_count": len(results),
-            "columns": ["Domain", "Table", "Column", "Key_Type", "Description"],
+            "columns": index.return_columns,
             "results": results
         }
     except Exception as e:
         return {"error": f"Error reading data dictionary: {str(e)}"}
 
 
+def _semantic_search(query: str, dictionary_path: Path, tool_config: dict) -> dict:
+    search_config = tool_config.get('semantic_search', {})
+    return_columns = tool_config.get('return_columns') or ['Column Name', 'Table Name', 'Data Type', 'Description']
+    index_path = search_config.get('index_path')
+    try:
+        # Fitted once per dictionary version and persisted, so workers start warm
+        index = get_dictionary_search_index(
+            str(dictionary_path),
+            tool_config.get('table_column', 'Table Name'),
+            tool_config.get('filter_column', 'Column Name'),
+            search_config.get('text_columns', ['Description']),
+            return_columns,
+            index_path=str(project_root / index_path) if index_path else None,
+        )
+        matches = index.search(
+            query,
+            top_k=search_config.get('top_k', tool_config.get('max_results', 5)),
+            min_score=search_config.get('min_score', 0.0),
+        )
+        if not matches["results"]:
+            return {"error": f"No data dictionary entries match '{query}'"}
+
+        return {
+            "Tool Message: >>> ": f"{len(matches['results'])} best matching fields for '{query}':",
+            "row_count": len(matches["results"]),
+            "columns": return_columns + ["score"],
+            "results": matches["results"],
+            "tables": matches["tables"]
+        }
+    except Exception as e:
+        return {"error": f"Error searching data dictionary: {str(e)}"}
+
+
 if __name__ == "__main__":
     # Get column name from user input
-    test_column = input("Enter column name to search (e.g. ACCT_ID): ").strip()
+    test_column = input("Enter column name to search (e.g. ArtistId): ").strip()
     
     print(f"\nSearching for column: {test_column}")
     result = get_db_field_definition(test_column)
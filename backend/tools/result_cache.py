@@ -0,0 +1,158 @@
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+
+_SQL_TOKENS = re.compile(
+    r"""
+    (?P<literal>'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+    |(?P<comment>--[^\n]*|/\*.*?\*/)
+    |(?P<space>\s+)
+    |(?P<other>[^'"`\[\s/-]+|[-/])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def normalize_sql(query: str) -> str:
+    """Canonical form of a query: comments dropped, whitespace collapsed,
+    everything outside quoted literals lower-cased, trailing semicolons removed"""
+    parts = []
+    for match in _SQL_TOKENS.finditer(query):
+        kind = match.lastgroup
+        if kind == 'literal':
+            parts.append(match.group())
+        elif kind in ('comment', 'space'):
+            if parts and parts[-1] != ' ':
+                parts.append(' ')
+        else:
+            parts.append(match.group().lower())
+    return ''.join(parts).strip().rstrip(';').strip()
+
+
+class ResultCache:
+    '''LRU cache of execute_sql_query results bounded by entry count and size.
+
+    Entries are tagged with the database version they were computed against:
+    ``PRAGMA data_version`` from a long-lived watcher connection (it changes
+    whenever another connection commits) plus the mtime/size of the database
+    file and its WAL. A lookup whose version no longer matches is a miss.
+    '''
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._watchers: Dict[str, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(db_path: str, query: str, max_results: int, return_format: str, count_mode: str) -> Tuple:
+        return (os.path.abspath(db_path), normalize_sql(query), max_results, return_format.lower(), count_mode)
+
+    def _data_version(self, db_path: str) -> Optional[int]:
+        watcher = self._watchers.get(db_path)
+        if watcher is None:
+            if not os.path.exists(db_path):
+                return None
+            watcher = sqlite3.connect(f"{Path(db_path).as_uri()}?mode=ro", uri=True, check_same_thread=False)
+            self._watchers[db_path] = watcher
+        return watcher.execute("PRAGMA data_version").fetchone()[0]
+
+    def current_version(self, db_path: str) -> Optional[Tuple]:
+        """Version tag for db_path; None if it cannot be determined (no caching)"""
+        db_path = os.path.abspath(db_path)
+        try:
+            stat = os.stat(db_path)
+        except OSError:
+            return None
+        try:
+            wal = os.stat(f"{db_path}-wal")
+            wal_signature = (wal.st_mtime_ns, wal.st_size)
+        except OSError:
+            wal_signature = None
+        try:
+            with self._lock:
+                data_version = self._data_version(db_path)
+        except sqlite3.Error:
+            return None
+        return (data_version, stat.st_ino, stat.st_mtime_ns, stat.st_size, wal_signature)
+
+    def get(self, key: Tuple) -> Tuple[Optional[Dict], Optional[Tuple]]:
+        """Return (cached result or None, current database version)"""
+        version = self.current_version(key[0])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if version is not None and entry[0] == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(entry[1]), version
+                self._remove(key)
+                self.invalidations += 1
+            self.misses += 1
+        return None, version
+
+    def put(self, key: Tuple, version: Optional[Tuple], result: Dict):
+        if version is None or "error" in result:
+            return
+        size = len(json.dumps(result, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, result, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Tuple):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_cache_config = config.tool_execute_sql.get('result_cache', {})
+
+# Global result cache instance
+result_cache = ResultCache(
+    max_entries=_cache_config.get('max_entries', 256),
+    max_bytes=_cache_config.get('max_bytes', 16 * 1024 * 1024),
+)
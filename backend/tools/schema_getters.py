@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
+import os
 import sqlite3
-from typing import Dict
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 
 class SchemaGetter(ABC):
     @abstractmethod
@@ -13,6 +16,93 @@ class SQLiteSchemaGetter(SchemaGetter):
         self.config = config
 
     def get_schema(self) -> Dict:
+        if self.config.get('introspection', 'bulk') == 'bulk':
+            try:
+                return self.get_schema_bulk()
+            except sqlite3.OperationalError:
+                # Table-valued pragma functions need SQLite >= 3.16
+                pass
+        return self.get_schema_per_table()
+
+    def get_schema_bulk(self) -> Dict:
+        """Introspect every table with a fixed number of set-based queries.
+
+        Columns, foreign keys and indexes (with their column lists) are read by
+        joining the table-valued ``pragma_*`` functions against ``sqlite_master``
+        instead of issuing several PRAGMA statements per table.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            tables_cte = """
+                WITH t AS (
+                    SELECT name, rowid AS ord FROM sqlite_master
+                    WHERE type='table'
+                    {}
+                    ORDER BY rowid
+                    LIMIT ?
+                )
+            """.format("AND name NOT LIKE 'sqlite_%'" if self.config.get('exclude_system_tables') else "")
+            params = [self.config.get('max_tables', 100)]
+
+            tables = {
+                name: {"name": name, "columns": [], "foreign_keys": []}
+                for (name,) in conn.execute(tables_cte + "SELECT name FROM t ORDER BY ord", params)
+            }
+
+            columns = conn.execute(tables_cte + """
+                SELECT t.name, c.name, c.type, c."notnull", c.pk
+                FROM t JOIN pragma_table_info(t.name) AS c
+                ORDER BY t.ord, c.cid
+            """, params)
+            for table_name, name, col_type, notnull, pk in columns:
+                tables[table_name]["columns"].append({
+                    "name": name,
+                    "type": col_type,
+                    "notnull": bool(notnull),
+                    "pk": bool(pk)
+                })
+
+            if self.config.get('include_relationships'):
+                foreign_keys = conn.execute(tables_cte + """
+                    SELECT t.name, fk."from", fk."table", fk."to"
+                    FROM t JOIN pragma_foreign_key_list(t.name) AS fk
+                    ORDER BY t.ord, fk.id, fk.seq
+                """, params)
+                for table_name, from_column, to_table, to_column in foreign_keys:
+                    tables[table_name]["foreign_keys"].append({
+                        "from": from_column,
+                        "to_table": to_table,
+                        "to_column": to_column
+                    })
+
+            indexes = []
+            if self.config.get('include_indexes'):
+                index_rows = conn.execute(tables_cte + """
+                    SELECT t.name, il.name, il."unique", ii.name
+                    FROM t
+                    JOIN pragma_index_list(t.name) AS il
+                    LEFT JOIN pragma_index_info(il.name) AS ii
+                    ORDER BY t.ord, il.seq, ii.seqno
+                """, params)
+                by_name = {}
+                for table_name, index_name, unique, column_name in index_rows:
+                    index = by_name.get((table_name, index_name))
+                    if index is None:
+                        index = by_name[(table_name, index_name)] = {
+                            "table": table_name,
+                            "name": index_name,
+                            "unique": bool(unique),
+                            "columns": []
+                        }
+                        indexes.append(index)
+                    if column_name is not None:
+                        index["columns"].append(column_name)
+
+            return {"tables": list(tables.values()), "indexes": indexes}
+        finally:
+            conn.close()
+
+    def get_schema_per_table(self) -> Dict:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
@@ -64,3 +154,173 @@ class SQLiteSchemaGetter(SchemaGetter):
         
         conn.close()
         return schema_info
+
+    def get_schema_version(self) -> int:
+        """Return SQLite's schema cookie, bumped on every DDL change."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("PRAGMA schema_version").fetchone()[0]
+        finally:
+            conn.close()
+
+
+def render_compact_table(table: Dict, indexes: List[Dict] = ()) -> str:
+    """One DDL-style line: Table(col TYPE PK, col TYPE -> Other.col, ...) | INDEX name(cols)"""
+    references = {}
+    for fk in table.get("foreign_keys", []):
+        target = f'{fk["to_table"]}.{fk["to_column"]}' if fk.get("to_column") else fk["to_table"]
+        references[fk["from"]] = target
+    columns = []
+    for column in table.get("columns", []):
+        parts = [column["name"]]
+        if column.get("type"):
+            parts.append(column["type"])
+        if column.get("pk"):
+            parts.append("PK")
+        elif column.get("notnull"):
+            parts.append("NOT NULL")
+        if column["name"] in references:
+            parts.append(f"-> {references[column['name']]}")
+        columns.append(" ".join(parts))
+    line = f"{table['name']}({', '.join(columns)})"
+    for index in indexes:
+        index_columns = ", ".join(str(name) for name in index.get("columns", []))
+        if index["name"].startswith("sqlite_autoindex_"):
+            # Backs a UNIQUE constraint; its generated name carries no information
+            line += f" | UNIQUE({index_columns})"
+        else:
+            line += f" | {'UNIQUE ' if index.get('unique') else ''}INDEX {index['name']}({index_columns})"
+    return line
+
+
+class SchemaSnapshot:
+    """An introspected schema plus the lookup indexes built over it."""
+
+    def __init__(self, schema: Dict, schema_version: int, signature: Optional[Tuple]):
+        self.schema = schema
+        self.schema_version = schema_version
+        self.signature = signature
+        self.validated_at = time.monotonic()
+        self.tables_by_name = {table["name"].lower(): table for table in schema["tables"]}
+        self.indexes_by_table: Dict[str, List[Dict]] = {}
+        for idx in schema.get("indexes", []):
+            self.indexes_by_table.setdefault(idx["table"].lower(), []).append(idx)
+        # A snapshot is one schema version, so renderings never go stale
+        self._compact_lines: Optional[Dict[str, str]] = None
+
+    def table(self, table_name: str) -> Optional[Dict]:
+        return self.tables_by_name.get(table_name.lower())
+
+    def indexes(self, table_name: str) -> List[Dict]:
+        return self.indexes_by_table.get(table_name.lower(), [])
+
+    @property
+    def table_names(self) -> List[str]:
+        return [table["name"] for table in self.schema["tables"]]
+
+    def compact(self, table_name: Optional[str] = None) -> Optional[str]:
+        """Compact rendering of one table or of the whole schema, built once per snapshot"""
+        if self._compact_lines is None:
+            self._compact_lines = {
+                table["name"].lower(): render_compact_table(table, self.indexes(table["name"]))
+                for table in self.schema["tables"]
+            }
+        if table_name is None:
+            return "\n".join(self._compact_lines.values())
+        return self._compact_lines.get(table_name.lower())
+
+
+class SchemaCache:
+    '''Process-wide schema cache keyed by database path and getter options.
+
+    A cached snapshot is served as long as the database file (and its WAL)
+    keep the same mtime/size. When the file changes, or the snapshot is older
+    than ``cache_timeout`` seconds, ``PRAGMA schema_version`` is consulted and
+    the schema is only re-introspected if the version actually moved.
+    '''
+
+    def __init__(self):
+        self._entries: Dict[Tuple, SchemaSnapshot] = {}
+        self._locks: Dict[Tuple, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    @staticmethod
+    def _file_signature(db_path: str) -> Optional[Tuple]:
+        try:
+            stat = os.stat(db_path)
+        except OSError:
+            return None
+        try:
+            wal = os.stat(f"{db_path}-wal")
+            wal_signature = (wal.st_mtime_ns, wal.st_size)
+        except OSError:
+            wal_signature = None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size, wal_signature)
+
+    @staticmethod
+    def _key(db_path: str, config: Dict) -> Tuple:
+        options = tuple(
+            config.get(option)
+            for option in ('exclude_system_tables', 'include_relationships', 'include_indexes', 'max_tables', 'introspection')
+        )
+        return (os.path.abspath(db_path), options)
+
+    def _lock_for(self, key: Tuple) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def _is_fresh(entry: Optional[SchemaSnapshot], signature: Optional[Tuple], ttl: float) -> bool:
+        return (
+            entry is not None
+            and signature is not None
+            and entry.signature == signature
+            and time.monotonic() - entry.validated_at < ttl
+        )
+
+    def get(self, db_path: str, config: Dict) -> SchemaSnapshot:
+        key = self._key(db_path, config)
+        ttl = config.get('cache_timeout', 300)
+
+        entry = self._entries.get(key)
+        signature = self._file_signature(db_path)
+        if self._is_fresh(entry, signature, ttl):
+            return entry
+
+        with self._lock_for(key):
+            # Another thread may have refreshed the entry while we waited
+            entry = self._entries.get(key)
+            signature = self._file_signature(db_path)
+            if self._is_fresh(entry, signature, ttl):
+                return entry
+
+            getter = SQLiteSchemaGetter(db_path=db_path, config=config)
+            same_file = entry is not None and entry.signature is not None and signature is not None \
+                and entry.signature[0] == signature[0]
+            if same_file:
+                # File touched or TTL expired: only re-introspect on DDL changes
+                if getter.get_schema_version() == entry.schema_version:
+                    entry.signature = signature
+                    entry.validated_at = time.monotonic()
+                    return entry
+
+            schema_version = getter.get_schema_version()
+            snapshot = SchemaSnapshot(getter.get_schema(), schema_version, self._file_signature(db_path))
+            if config.get('output_format') == 'compact':
+                # Render once here, under the lock, instead of on the first tool call
+                snapshot.compact()
+            self._entries[key] = snapshot
+            return snapshot
+
+    def invalidate(self, db_path: Optional[str] = None) -> None:
+        with self._guard:
+            if db_path is None:
+                self._entries.clear()
+                return
+            path = os.path.abspath(db_path)
+            for key in [key for key in self._entries if key[0] == path]:
+                del self._entries[key]
+
+
+# Global schema cache instance
+schema_cache = SchemaCache()
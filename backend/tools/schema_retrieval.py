@@ -0,0 +1,180 @@
+import csv
+import json
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Add the project root to Python path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from config import config
+from tools.dictionary_search import split_identifier
+from tools.schema_getters import SchemaSnapshot, schema_cache
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = frozenset(
+    "a an and are as at be by for from give has have how i in is it list me many much of on or show "
+    "that the their there this to was what which who with".split()
+)
+
+
+def _stem(word: str) -> str:
+    """Plural folding only: enough for 'albums' to meet 'Album' and 'invoices' to meet 'Invoice'"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(word) for word in _WORD.findall(split_identifier(text).lower()) if word not in _STOP_WORDS]
+
+
+class SchemaRetriever:
+    '''Scores the tables of one schema snapshot against a user question.
+
+    Each table is a TF-IDF document made of its name (weighted up), its
+    column names and the data dictionary descriptions of those columns.
+    Identifiers are split into words and plurals folded, so "albums by the
+    artist" matches Album and Artist. The matched tables are extended with
+    their direct foreign-key neighbours, which the SQL usually needs to join.
+    '''
+
+    TABLE_NAME_WEIGHT = 3
+    # Only matches scoring at least this fraction of the best one bring their neighbours
+    NEIGHBOUR_SCORE_RATIO = 0.5
+
+    def __init__(self, snapshot: SchemaSnapshot, descriptions: Optional[Dict[str, List[str]]] = None):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        self.snapshot = snapshot
+        self.table_names = [table["name"] for table in snapshot.schema.get("tables", [])]
+        descriptions = {name.lower(): texts for name, texts in (descriptions or {}).items()}
+        documents = []
+        for table in snapshot.schema.get("tables", []):
+            parts = [table["name"]] * self.TABLE_NAME_WEIGHT
+            parts += [column["name"] for column in table.get("columns", [])]
+            parts += descriptions.get(table["name"].lower(), [])
+            documents.append(" ".join(parts))
+
+        self.neighbours: Dict[str, Set[str]] = {name: set() for name in self.table_names}
+        for table in snapshot.schema.get("tables", []):
+            for foreign_key in table.get("foreign_keys", []):
+                other = snapshot.table(foreign_key["to_table"])
+                if other is not None and other["name"] != table["name"]:
+                    self.neighbours[table["name"]].add(other["name"])
+                    self.neighbours[other["name"]].add(table["name"])
+
+        self.vectorizer = TfidfVectorizer(tokenizer=tokenize, lowercase=False, token_pattern=None, sublinear_tf=True)
+        self.matrix = self.vectorizer.fit_transform(documents).tocsr() if documents else None
+
+    def score(self, question: str) -> np.ndarray:
+        if self.matrix is None:
+            return np.zeros(0)
+        return (self.matrix @ self.vectorizer.transform([question]).T).toarray().ravel()
+
+    def retrieve(self, question: str, top_k: int = 3, include_neighbours: bool = True,
+                 max_tables: Optional[int] = None, min_score: float = 0.0) -> List[Dict]:
+        """Return [{"table", "score", "reason"}]: top_k matches best first, then their FK neighbours"""
+        scores = self.score(question)
+        ranked = [int(i) for i in np.argsort(-scores, kind="stable")[:top_k] if scores[i] > min_score]
+        selected = [
+            {"table": self.table_names[i], "score": round(float(scores[i]), 4), "reason": "match"}
+            for i in ranked
+        ]
+        if include_neighbours:
+            chosen = {entry["table"] for entry in selected}
+            position = {name: i for i, name in enumerate(self.table_names)}
+            best = selected[0]["score"] if selected else 0.0
+            for entry in list(selected):
+                # Weak matches would pull in their whole neighbourhood
+                if entry["score"] < best * self.NEIGHBOUR_SCORE_RATIO:
+                    continue
+                # Best-scoring neighbours first so max_tables cuts the least relevant; ties in
+                # schema order, since set order changes between processes and so would the prompt
+                for neighbour in sorted(self.neighbours[entry["table"]] - chosen,
+                                        key=lambda name: (-scores[position[name]], position[name])):
+                    chosen.add(neighbour)
+                    selected.append({
+                        "table": neighbour,
+                        "score": round(float(scores[position[neighbour]]), 4),
+                        "reason": f"foreign key of {entry['table']}",
+                    })
+        return selected[:max_tables] if max_tables else selected
+
+
+def _load_descriptions() -> Dict[str, List[str]]:
+    """Data dictionary description texts grouped by table name"""
+    tool_config = config.tool_get_data_dictionary
+    path = project_root / tool_config.get('file_path', 'Database_Data_Dictionary_with_Descriptions.csv')
+    if not path.exists():
+        return {}
+    table_column = tool_config.get('table_column', 'Table Name')
+    text_columns = tool_config.get('semantic_search', {}).get('text_columns', ['Description'])
+    descriptions: Dict[str, List[str]] = {}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for record in csv.DictReader(f):
+            record = {key.strip(): value for key, value in record.items() if key}
+            descriptions.setdefault(record.get(table_column, ''), []).extend(
+                record.get(name, '') for name in text_columns
+            )
+    return descriptions
+
+
+_retrievers: Dict[str, Tuple[Optional[int], SchemaRetriever]] = {}
+_retrievers_lock = threading.Lock()
+
+
+def get_schema_retriever(db_path: Optional[str] = None) -> SchemaRetriever:
+    """Return the retriever for the current schema, refitting only when the schema or dictionary changes"""
+    db_path = db_path or config.database_config.get('default_path')
+    # The schema cache hands out a new snapshot object only after re-introspecting
+    snapshot = schema_cache.get(db_path, config.tool_get_schema)
+    dictionary_path = project_root / config.tool_get_data_dictionary.get('file_path', '')
+    try:
+        dictionary_mtime = os.stat(dictionary_path).st_mtime_ns
+    except OSError:
+        dictionary_mtime = None
+    key = os.path.abspath(db_path)
+    cached = _retrievers.get(key)
+    if cached is not None and cached[1].snapshot is snapshot and cached[0] == dictionary_mtime:
+        return cached[1]
+    with _retrievers_lock:
+        cached = _retrievers.get(key)
+        if cached is None or cached[1].snapshot is not snapshot or cached[0] != dictionary_mtime:
+            cached = (dictionary_mtime, SchemaRetriever(snapshot, _load_descriptions()))
+            _retrievers[key] = cached
+        return cached[1]
+
+
+def relevant_schema_prompt(question: str, retrieval_config: Optional[Dict] = None) -> Optional[str]:
+    """System prompt section with the definitions of the tables relevant to question"""
+    retrieval_config = retrieval_config if retrieval_config is not None else config.assistant_config.get('schema_retrieval', {})
+    retriever = get_schema_retriever()
+    selected = retriever.retrieve(
+        question,
+        top_k=retrieval_config.get('top_k', 3),
+        include_neighbours=retrieval_config.get('include_foreign_key_neighbours', True),
+        max_tables=retrieval_config.get('max_tables', 8),
+        min_score=retrieval_config.get('min_score', 0.05),
+    )
+    if not selected:
+        return None
+    snapshot = retriever.snapshot
+    if config.tool_get_schema.get('output_format', 'json') == 'compact':
+        definitions = "\n".join(snapshot.compact(entry["table"]) for entry in selected)
+    else:
+        definitions = "\n".join(
+            json.dumps(snapshot.table(entry["table"]), separators=(",", ":")) for entry in selected
+        )
+    return (
+        "Tables most relevant to the question, with the tables they join to, from the live schema. "
+        "Use them directly; call get_schema only for tables not listed here:\n" + definitions
+    )